@@ -0,0 +1,248 @@
+"""Hot/cold split of complaints.
+
+Completed and rejected complaints untouched for ``ARCHIVE_AFTER_DAYS`` are
+moved, with their update history, from ``complaints``/``complaint_updates``
+into ``complaints_archive``/``complaint_updates_archive``. Ids are kept.
+That keeps the tables every dashboard query scans down to the working set.
+
+``archive_closed`` moves at most ``ARCHIVE_BATCH_SIZE`` complaints per
+transaction, so a run never holds locks on more than one batch. On Postgres
+the batch is picked with ``FOR UPDATE SKIP LOCKED``, so a complaint that is
+being edited is left for the next run. It is exposed as
+``flask --app app archive-complaints`` for cron.
+
+Reads stay transparent:
+
+- ``get`` finds a single archived complaint by id;
+- ``paginate`` pages through both tables as one list;
+- ``all_complaints`` is a Core ``UNION ALL`` of both for the export and the
+  heatmap;
+- ``complaint_archive_counts`` keeps per (status, category, priority)
+  totals in step with each batch, so analytics never scans the archive.
+
+Updating an archived complaint moves it back with ``restore``.
+
+Ids must never be handed out again, or a new row would collide with its
+archived namesake. Postgres sequences never go back; SQLite does that only
+for tables created with ``AUTOINCREMENT``, which ``create_all`` uses now but
+cannot add to older tables, so ``archive_closed`` refuses to run on those.
+"""
+import logging
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import delete, exists, func, insert, literal, select, text, union_all
+from sqlalchemy.orm import aliased
+
+import search
+from extensions import db
+from models import ArchiveCount, ArchivedComplaint, ArchivedComplaintUpdate, Complaint, ComplaintUpdate
+
+logger = logging.getLogger('snapfix.archive')
+
+CLOSED_STATUSES = ('completed', 'rejected')
+COMPLAINT_COLUMNS = [column.name for column in Complaint.__table__.columns]
+UPDATE_COLUMNS = [column.name for column in ComplaintUpdate.__table__.columns]
+
+
+def _columns(model, names):
+    return [model.__table__.c[name] for name in names]
+
+
+class ArchiveError(RuntimeError):
+    pass
+
+
+def _check_ids_are_not_reused():
+    if db.engine.dialect.name != 'sqlite':
+        return
+    for table in (Complaint.__tablename__, ComplaintUpdate.__tablename__):
+        sql = db.session.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                {'name': table})
+        if sql and 'AUTOINCREMENT' not in sql.upper():
+            raise ArchiveError(
+                f"SQLite table {table!r} was created without AUTOINCREMENT, so archived ids could be "
+                "reused; move the data into a database created by 'flask --app app init-db' before archiving")
+
+
+def _eligible_ids(cutoff, batch_size):
+    child = aliased(Complaint)
+    stmt = (select(Complaint.id)
+            .where(Complaint.status.in_(CLOSED_STATUSES),
+                   Complaint.updated_at < cutoff,
+                   # Parents wait until their duplicates have moved, so no hot row
+                   # ever points at an archived one.
+                   ~exists().where(child.parent_id == Complaint.id))
+            .order_by(Complaint.id)
+            .limit(batch_size))
+    if db.engine.dialect.name == 'postgresql':
+        stmt = stmt.with_for_update(skip_locked=True, of=Complaint)
+    return db.session.scalars(stmt).all()
+
+
+def _adjust_counts(source, ids, sign):
+    groups = db.session.execute(
+        select(func.coalesce(source.status, ''), source.category, func.coalesce(source.priority, ''),
+               func.count())
+        .where(source.id.in_(ids))
+        .group_by(source.status, source.category, source.priority)
+    ).all()
+    for status, category, priority, count in groups:
+        key = {'status': status, 'category': category, 'priority': priority}
+        updated = db.session.execute(
+            ArchiveCount.__table__.update()
+            .where(*(ArchiveCount.__table__.c[name] == value for name, value in key.items()))
+            .values(count=ArchiveCount.count + sign * count)
+        )
+        if updated.rowcount == 0:
+            db.session.execute(insert(ArchiveCount).values(count=sign * count, **key))
+
+
+def _move(ids, source, target, source_updates, target_updates, archived_at=None):
+    """Copy complaints ``ids`` and their updates from one pair of tables to the other, then delete them."""
+    source_columns = _columns(source, COMPLAINT_COLUMNS)
+    target_names = list(COMPLAINT_COLUMNS)
+    if archived_at is not None:
+        source_columns.append(literal(archived_at, ArchivedComplaint.archived_at.type))
+        target_names.append('archived_at')
+    db.session.execute(insert(target).from_select(
+        target_names, select(*source_columns).where(source.id.in_(ids))))
+    db.session.execute(insert(target_updates).from_select(
+        UPDATE_COLUMNS, select(*_columns(source_updates, UPDATE_COLUMNS))
+        .where(source_updates.complaint_id.in_(ids))))
+    db.session.execute(delete(source_updates).where(source_updates.complaint_id.in_(ids)))
+    db.session.execute(delete(source).where(source.id.in_(ids)))
+
+
+def archive_closed(older_than_days, batch_size, max_batches=None, now=None):
+    """Archive closed complaints not updated for ``older_than_days``; returns how many moved."""
+    _check_ids_are_not_reused()
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=older_than_days)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = _eligible_ids(cutoff, batch_size)
+        if not ids:
+            db.session.rollback()
+            break
+        try:
+            _adjust_counts(Complaint, ids, 1)
+            _move(ids, Complaint, ArchivedComplaint, ComplaintUpdate, ArchivedComplaintUpdate, archived_at=now)
+            search.remove_complaints(ids)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        moved += len(ids)
+        batches += 1
+        logger.info('complaints archived', extra={'complaints': len(ids), 'through_id': ids[-1]})
+    return moved
+
+
+def restore(complaint_id):
+    """Move an archived complaint back into ``complaints``, in the caller's transaction.
+
+    Returns the hot ``Complaint``, or ``None`` when ``complaint_id`` isn't archived.
+    """
+    archived = db.session.get(ArchivedComplaint, complaint_id)
+    if archived is None:
+        return None
+    if archived.parent_id is not None and db.session.get(Complaint, archived.parent_id) is None:
+        archived.parent_id = None  # its incident is archived too; hot rows can't point there
+        db.session.flush()
+    _adjust_counts(ArchivedComplaint, [complaint_id], -1)
+    # Drop the ORM copy first so its cascade doesn't act on rows removed below.
+    db.session.expunge(archived)
+    _move([complaint_id], ArchivedComplaint, Complaint, ArchivedComplaintUpdate, ComplaintUpdate)
+    complaint = db.session.get(Complaint, complaint_id)
+    search.index_complaint(complaint)
+    logger.info('complaint restored from archive', extra={'complaint_id': complaint_id})
+    return complaint
+
+
+def detach_children(complaint_id):
+    """Unlink archived duplicates from an incident that is being deleted."""
+    ArchivedComplaint.query.filter_by(parent_id=complaint_id).update(
+        {'parent_id': None}, synchronize_session=False)
+
+
+def delete_archived(complaint):
+    """Delete an archived complaint and its history, in the caller's transaction."""
+    _adjust_counts(ArchivedComplaint, [complaint.id], -1)
+    detach_children(complaint.id)
+    db.session.delete(complaint)
+
+
+def get(complaint_id):
+    return db.session.get(ArchivedComplaint, complaint_id)
+
+
+def counts(dimension):
+    """``{value: archived complaints}`` for ``'status'``, ``'category'`` or ``'priority'``."""
+    column = ArchiveCount.__table__.c[dimension]
+    rows = db.session.execute(select(column, func.sum(ArchiveCount.count)).group_by(column)).all()
+    # NULLs are stored as '' in the key columns.
+    return {value if value != '' else None: int(total) for value, total in rows if total}
+
+
+def all_complaints():
+    """``complaints UNION ALL complaints_archive`` as a subquery with the complaint columns."""
+    return union_all(
+        select(*_columns(Complaint, COMPLAINT_COLUMNS)),
+        select(*_columns(ArchivedComplaint, COMPLAINT_COLUMNS)),
+    ).subquery('all_complaints')
+
+
+def all_updates():
+    return union_all(
+        select(*_columns(ComplaintUpdate, UPDATE_COLUMNS)),
+        select(*_columns(ArchivedComplaintUpdate, UPDATE_COLUMNS)),
+    ).subquery('all_complaint_updates')
+
+
+def paginate(where, order, page, per_page):
+    """One page of hot and archived complaints as a single list.
+
+    ``where(model)`` returns the filter clauses and ``order(model)`` the sort
+    keys as ``(expression, descending)`` pairs, each built for whichever
+    model (``Complaint`` or ``ArchivedComplaint``) it is given. Only ids and
+    sort keys go through the ``UNION ALL``; the page's rows are then loaded
+    from each table. Returns ``(complaints, total)``.
+    """
+    def part(model):
+        keys = [expression.label(f'k{i}') for i, (expression, _) in enumerate(order(model))]
+        return select(model.id.label('id'), literal(model.archived).label('archived'), *keys).where(*where(model))
+
+    rows = union_all(part(Complaint), part(ArchivedComplaint)).subquery()
+    total = db.session.scalar(select(func.count()).select_from(rows))
+    ordering = [rows.c[f'k{i}'].desc() if descending else rows.c[f'k{i}']
+                for i, (_, descending) in enumerate(order(Complaint))]
+    page_rows = db.session.execute(
+        select(rows.c.id, rows.c.archived)
+        .order_by(*ordering, rows.c.id.desc())
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    ).all()
+
+    loaded = {}
+    for model in (Complaint, ArchivedComplaint):
+        ids = [row.id for row in page_rows if bool(row.archived) == model.archived]
+        if ids:
+            loaded.update({(model.archived, complaint.id): complaint
+                           for complaint in model.query.filter(model.id.in_(ids))})
+    return [loaded[(bool(row.archived), row.id)] for row in page_rows], total
+
+
+def init_app(app):
+    @app.cli.command('archive-complaints')
+    @click.option('--days', type=int, default=None, help='Minimum age in days (default ARCHIVE_AFTER_DAYS).')
+    @click.option('--batch-size', type=int, default=None, help='Complaints per transaction.')
+    @click.option('--max-batches', type=int, default=None, help='Stop after this many batches.')
+    def archive_complaints_command(days, batch_size, max_batches):
+        """Move old completed/rejected complaints into the archive tables."""
+        try:
+            moved = archive_closed(days if days is not None else app.config['ARCHIVE_AFTER_DAYS'],
+                                   batch_size or app.config['ARCHIVE_BATCH_SIZE'], max_batches)
+        except ArchiveError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'{moved} complaint(s) archived')
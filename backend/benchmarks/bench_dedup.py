@@ -0,0 +1,105 @@
+"""Measure near-duplicate checks against a large in-memory index.
+
+Fills a ``dedup.DuplicateIndex`` with open complaints spread over a city
+(plus an optional hotspot, e.g. a flooded street everyone reports), then
+times ``candidates`` for new reports. The database catch-up in
+``dedup.find_parent`` is a ``created_at`` range query and is not included.
+
+Example (from the backend folder)::
+
+    python benchmarks/bench_dedup.py --open 100000 --hotspot 0.1
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import common  # noqa: E402
+
+
+def build_index(dedup, vectorize, size, hotspot, rng, now):
+    index = dedup.DuplicateIndex()
+    # Only len(DESCRIPTIONS) distinct texts exist, so vectorize each once.
+    vectors = vectorize(common.DESCRIPTIONS)
+    centre = (sum(common.LAT_RANGE) / 2, sum(common.LON_RANGE) / 2)
+    for complaint_id in range(1, size + 1):
+        if rng.random() < hotspot:
+            lat, lon = centre[0] + rng.uniform(-0.005, 0.005), centre[1] + rng.uniform(-0.005, 0.005)
+        else:
+            lat, lon = rng.uniform(*common.LAT_RANGE), rng.uniform(*common.LON_RANGE)
+        text = rng.randrange(len(common.DESCRIPTIONS))
+        index.add(complaint_id, complaint_id, common.CATEGORIES[text % len(common.CATEGORIES)], lat, lon,
+                  now - timedelta(minutes=rng.randint(0, 60 * 48)), vectors[text])
+    return index, centre
+
+
+def measure(index, queries, vectors, now):
+    latencies = []
+    start = time.perf_counter()
+    for category, lat, lon, text in queries:
+        began = time.perf_counter()
+        index.candidates(category, lat, lon, vectors[text], now)
+        latencies.append(time.perf_counter() - began)
+    return common.summarize(latencies, 0, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--open', type=int, default=100000, help='open complaints in the index')
+    parser.add_argument('--hotspot', type=float, default=0.1,
+                        help='fraction of complaints packed into a ~1km square at the city centre')
+    parser.add_argument('--checks', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check-baseline', action='store_true')
+    parser.add_argument('--baseline', default='dedup')
+    args = parser.parse_args(argv)
+
+    if common.BACKEND_DIR not in sys.path:
+        sys.path.insert(0, common.BACKEND_DIR)
+    import dedup
+    import ml
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    vectorize = ml.tfidf_vectorizer().transform
+    started = time.perf_counter()
+    index, centre = build_index(dedup, vectorize, args.open, args.hotspot, rng, now)
+    print(f'indexed {len(index)} complaints in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+    vectors = vectorize(common.DESCRIPTIONS)
+    city = [(common.CATEGORIES[t % len(common.CATEGORIES)], rng.uniform(*common.LAT_RANGE),
+             rng.uniform(*common.LON_RANGE), t)
+            for t in (rng.randrange(len(common.DESCRIPTIONS)) for _ in range(args.checks))]
+    hot = [(category, centre[0] + rng.uniform(-0.005, 0.005), centre[1] + rng.uniform(-0.005, 0.005), t)
+           for category, _, _, t in city]
+
+    # First pass stacks each cell's matrix; measure the steady state after it.
+    measure(index, city + hot, vectors, now)
+    results = {
+        f'dedup city n={args.open}': measure(index, city, vectors, now),
+        f'dedup hotspot n={args.open}': measure(index, hot, vectors, now),
+    }
+    common.print_table(results)
+
+    if args.save_baseline:
+        path = common.save_baseline(args.baseline, {
+            'config': {'open': args.open, 'hotspot': args.hotspot, 'checks': args.checks},
+            'environment': common.environment(),
+            'results': results,
+        })
+        print(f'Baseline saved to {path}', file=sys.stderr)
+    if args.check_baseline:
+        regressions = common.compare(results, common.load_baseline(args.baseline)['results'])
+        for key, before, after in regressions:
+            print(f'REGRESSION {key}: p95 {before:.2f}ms -> {after:.2f}ms', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Measure heatmap tile responses for a large number of complaints.
+
+Loads ``--complaints`` synthetic complaints (default one million, spread over
+the same city box as the API benchmark) straight into a ``geo.GeoIndex``.
+It then reports the time to build each zoom level the first time, the
+steady-state time to produce a city-wide response including JSON encoding,
+and the cost of applying one changed complaint. Reading rows from the
+database is not included; ``GET /api/analytics/geo`` in bench_api.py
+covers the endpoint end to end.
+
+Example (from the backend folder)::
+
+    python benchmarks/bench_geo.py --complaints 1000000 --zooms 10 12 14 16
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import common  # noqa: E402
+
+Row = namedtuple('Row', 'id latitude longitude status category priority updated_at')
+
+
+def rows(count, rng, now):
+    for complaint_id in range(1, count + 1):
+        yield Row(complaint_id, rng.uniform(*common.LAT_RANGE), rng.uniform(*common.LON_RANGE),
+                  rng.choice(common.STATUSES), rng.choice(common.CATEGORIES), rng.choice(common.PRIORITIES),
+                  now - timedelta(minutes=complaint_id % 100000))
+
+
+def timed(fn, repeat):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - began)
+    return common.summarize(latencies, 0, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--complaints', type=int, default=1000000)
+    parser.add_argument('--zooms', type=int, nargs='+', default=[10, 12, 14, 16])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check-baseline', action='store_true')
+    parser.add_argument('--baseline', default='geo')
+    args = parser.parse_args(argv)
+
+    if common.BACKEND_DIR not in sys.path:
+        sys.path.insert(0, common.BACKEND_DIR)
+    import geo
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    index = geo.GeoIndex(reload_seconds=0)
+    started = time.perf_counter()
+    index.load_rows(rows(args.complaints, rng, now))
+    print(f'loaded {len(index)} complaints in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+    results = {}
+    for zoom in args.zooms:
+        started = time.perf_counter()
+        tiles = index.heatmap(zoom)
+        build_ms = (time.perf_counter() - started) * 1000
+        body = json.dumps({'zoom': zoom, 'tiles': tiles})
+        print(f'zoom {zoom}: {len(tiles)} tiles, {len(body) / 1024:.0f} KiB, first build {build_ms:.0f}ms',
+              file=sys.stderr)
+        results[f'geo zoom={zoom} n={args.complaints}'] = timed(
+            lambda: json.dumps({'zoom': zoom, 'tiles': index.heatmap(zoom)}), args.repeat)
+
+    def change_one():
+        complaint_id = rng.randint(1, args.complaints)
+        index.upsert(complaint_id, rng.uniform(*common.LAT_RANGE), rng.uniform(*common.LON_RANGE),
+                     rng.choice(common.STATUSES), rng.choice(common.CATEGORIES), rng.choice(common.PRIORITIES))
+
+    results[f'geo upsert ({len(args.zooms)} zooms cached)'] = timed(change_one, args.repeat * 20)
+    common.print_table(results)
+
+    if args.save_baseline:
+        path = common.save_baseline(args.baseline, {
+            'config': {'complaints': args.complaints, 'zooms': args.zooms},
+            'environment': common.environment(),
+            'results': results,
+        })
+        print(f'Baseline saved to {path}', file=sys.stderr)
+    if args.check_baseline:
+        regressions = common.compare(results, common.load_baseline(args.baseline)['results'])
+        for key, before, after in regressions:
+            print(f'REGRESSION {key}: p95 {before:.2f}ms -> {after:.2f}ms', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
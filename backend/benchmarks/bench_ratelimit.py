@@ -0,0 +1,118 @@
+"""Measure what the rate limiter adds to each request.
+
+Times a view wrapped in ``ratelimit.limit`` inside a request context, so
+every call includes the rule lookup, the caller key (JWT identity or
+client IP), the bucket update and the metrics counter. The view itself does
+nothing. Also times the memory storage on its own with a new key per call,
+which is the insert-and-evict path, and a Redis-compatible server when
+``--redis`` is given.
+
+Example (from the backend folder)::
+
+    python benchmarks/bench_ratelimit.py --calls 200000
+    python benchmarks/bench_ratelimit.py --redis redis://localhost:6379/15
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import common  # noqa: E402
+
+TARGET_US = 50
+
+
+def measure(fn, calls):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(calls):
+        began = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - began)
+    return common.summarize(latencies, 0, time.perf_counter() - start)
+
+
+def print_us_table(results):
+    header = f"{'scenario':<34}{'calls':>9}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}"
+    print(header)
+    print('-' * len(header))
+    for key, row in results.items():
+        print(f"{key:<34}{row['requests']:>9}{row['p50_ms'] * 1000:>10.1f}"
+              f"{row['p95_ms'] * 1000:>10.1f}{row['p99_ms'] * 1000:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--redis', help='Redis URL to also time the shared storage (keys are prefixed)')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check-baseline', action='store_true')
+    parser.add_argument('--baseline', default='ratelimit')
+    args = parser.parse_args(argv)
+
+    db_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='snapfix-bench-'), 'bench.sqlite3')
+    common.import_app(db_url)
+    from flask_jwt_extended import create_access_token, verify_jwt_in_request
+
+    import ratelimit
+    import schema
+    from app import create_app
+
+    # import_app turns the limiter off for the other benchmarks.
+    flask_app = create_app({'SQLALCHEMY_DATABASE_URI': db_url, 'RATELIMIT_ENABLED': True,
+                            'RATE_LIMITS': {'open': '1000000000/second', 'closed': '1/day'}})
+    with flask_app.app_context():
+        schema.upgrade()
+        token = create_access_token(identity='42')
+
+    def view():
+        return 'ok'
+
+    open_view = ratelimit.limit('open')(view)
+    closed_view = ratelimit.limit('closed')(view)
+
+    results = {}
+    with flask_app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+        verify_jwt_in_request()
+        open_view()
+        results['no limiter'] = measure(view, args.calls)
+        results['allowed, JWT identity'] = measure(open_view, args.calls)
+        closed_view()
+        results['limited (429 response)'] = measure(closed_view, args.calls // 10)
+    with flask_app.test_request_context(environ_base={'REMOTE_ADDR': '198.51.100.7'}):
+        results['allowed, client IP'] = measure(open_view, args.calls)
+
+    storage = ratelimit.MemoryStorage(max_keys=args.calls // 2)
+    keys = iter(range(10 * args.calls))
+    results['memory storage, new key per call'] = measure(
+        lambda: storage.acquire(f'bench:{next(keys)}', 10, 10 / 60), args.calls)
+
+    if args.redis:
+        shared = ratelimit.RedisStorage(args.redis, prefix='snapfix:bench:ratelimit:')
+        results['redis storage, same key'] = measure(
+            lambda: shared.acquire('bench', 1_000_000_000, 1e9), args.calls // 10)
+
+    print_us_table(results)
+    added = results['allowed, JWT identity']['p50_ms'] * 1000 - results['no limiter']['p50_ms'] * 1000
+    print(f'limiter adds {added:.1f}us per allowed request at p50 (target < {TARGET_US}us)')
+
+    if args.save_baseline:
+        path = common.save_baseline(args.baseline, {
+            'config': {'calls': args.calls},
+            'environment': common.environment(),
+            'results': results,
+        })
+        print(f'Baseline saved to {path}', file=sys.stderr)
+    if args.check_baseline:
+        regressions = common.compare(results, common.load_baseline(args.baseline)['results'])
+        for key, before, after in regressions:
+            print(f'REGRESSION {key}: p95 {before * 1000:.1f}us -> {after * 1000:.1f}us', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Time the worker route solver and compare its routes with filing order.
+
+For each stop count, random stops in the city box get random priorities and
+``routing.solve`` is timed from a fixed start (distance matrix, nearest
+neighbour and 2-opt together). The table also gives the priority-weighted
+arrival distance and the plain route length of three orders: filing order
+(what the worker dashboard showed before), nearest neighbour alone, and the
+solver's.
+
+Example (from the backend folder)::
+
+    python benchmarks/bench_route.py --stops 10 50 100 200 --repeat 50
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import common  # noqa: E402
+
+TARGET_MS = 50  # for 200 stops
+START = (sum(common.LAT_RANGE) / 2, sum(common.LON_RANGE) / 2)
+
+
+def instance(rng, stops):
+    points = [(rng.uniform(*common.LAT_RANGE), rng.uniform(*common.LON_RANGE)) for _ in range(stops)]
+    return points, [rng.choice(common.PRIORITIES) for _ in range(stops)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--stops', type=int, nargs='+', default=[10, 50, 100, 200])
+    parser.add_argument('--repeat', type=int, default=50, help='instances per stop count')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check-baseline', action='store_true')
+    parser.add_argument('--baseline', default='route')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, common.BACKEND_DIR)
+    import numpy as np
+
+    import routing
+
+    rng = random.Random(0)
+    results, quality = {}, {}
+    for stops in args.stops:
+        latencies, costs = [], {'filing order': [], 'nearest neighbour': [], 'solver': []}
+        lengths = {name: [] for name in costs}
+        for _ in range(args.repeat):
+            points, priorities = instance(rng, stops)
+            weights = [routing.priority_weight(priority) for priority in priorities]
+            began = time.perf_counter()
+            order, _ = routing.solve(START, points, weights)
+            latencies.append(time.perf_counter() - began)
+
+            everything = [START, *points]
+            dist = routing.distance_matrix([p[0] for p in everything], [p[1] for p in everything])
+            w = np.array([0.0, *weights])
+            for name, route in (('filing order', list(range(stops + 1))),
+                                ('nearest neighbour', routing.nearest_neighbour(dist, w)),
+                                ('solver', [0, *(k + 1 for k in order)])):
+                costs[name].append(routing.route_cost(route, dist, w))
+                lengths[name].append(float(dist[route[:-1], route[1:]].sum()))
+        results[f'{stops} stops'] = common.summarize(latencies, 0, sum(latencies))
+        quality[stops] = {name: (float(np.mean(costs[name])), float(np.mean(lengths[name]))) for name in costs}
+
+    common.print_table(results)
+    print()
+    header = f"{'stops':>6}  {'order':<20}{'weighted km':>14}{'route km':>11}"
+    print(header)
+    print('-' * len(header))
+    for stops, rows in quality.items():
+        for name, (cost, length) in rows.items():
+            print(f'{stops:>6}  {name:<20}{cost:>14.0f}{length:>11.1f}')
+
+    largest = max(args.stops)
+    p95 = results[f'{largest} stops']['p95_ms']
+    print(f'\n{largest} stops solved in {p95:.1f}ms at p95 (target < {TARGET_MS}ms for 200)')
+
+    if args.save_baseline:
+        path = common.save_baseline(args.baseline, {
+            'config': {'stops': args.stops, 'repeat': args.repeat},
+            'environment': common.environment(),
+            'results': results,
+        })
+        print(f'Baseline saved to {path}', file=sys.stderr)
+    if args.check_baseline:
+        regressions = common.compare(results, common.load_baseline(args.baseline)['results'])
+        for key, before, after in regressions:
+            print(f'REGRESSION {key}: p95 {before:.1f}ms -> {after:.1f}ms', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""CPU cost of encoding the admin complaint list, before and after responses.py.
+
+"before" is the stdlib encoder with no compression, which is what ``jsonify``
+did originally. "after" is the orjson provider with gzip (or brotli when
+installed) negotiated from ``Accept-Encoding``. Three things are measured,
+all as process CPU time per response:
+
+- encode: building the admin list rows from loaded complaints and encoding
+  them into response bytes;
+- compress: compressing that body for the client's ``Accept-Encoding``;
+- request: the whole ``GET /api/complaints?limit=N`` as admin through the
+  test client, including queries and worker scoring.
+
+Example (from the backend folder)::
+
+    python benchmarks/bench_serialization.py --limit 100 --repeat 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import common  # noqa: E402
+
+VARIANTS = {
+    'before': {'FAST_JSON': False, 'COMPRESS_ENABLED': False},
+    'after': {'FAST_JSON': True, 'COMPRESS_ENABLED': True},
+}
+
+
+def cpu_times(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        samples.append(time.process_time() - start)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--complaints', type=int, default=2000)
+    parser.add_argument('--limit', type=int, default=100, help='complaints per admin list page')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--accept-encoding', default='gzip, deflate, br')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--baseline', default='serialization')
+    args = parser.parse_args(argv)
+
+    db_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='snapfix-bench-'), 'bench.sqlite3')
+    base_app = common.import_app(db_url)
+    ids = common.seed(base_app, 50, 10, args.complaints, random.Random(0))
+
+    from app import create_app
+    from models import Complaint
+    from responses import compress_response
+    from serializers import complaint_summary
+
+    headers = {'Accept-Encoding': args.accept_encoding}
+    results, sizes = {}, {}
+    for name, overrides in VARIANTS.items():
+        flask_app = create_app(dict(overrides, SQLALCHEMY_DATABASE_URI=db_url))
+        token = common.issue_token(flask_app, ids['admin_id'])
+
+        with flask_app.app_context():
+            complaints = Complaint.query.order_by(Complaint.created_at.desc()).limit(args.limit).all()
+            for complaint in complaints:  # load relationships outside the timed region
+                complaint.user, complaint.worker
+            isoformat = name == 'before'
+
+            def build():
+                rows = []
+                for complaint in complaints:
+                    row = dict(complaint_summary(complaint), worker='Worker 1', worker_id=1, score=1.23)
+                    if isoformat:
+                        # What the routes did per field before responses.py.
+                        row['created_at'] = row['created_at'].isoformat()
+                        row['updated_at'] = row['updated_at'].isoformat()
+                    rows.append(row)
+                return {'data': rows, 'page': 1, 'limit': args.limit,
+                        'total_items': args.complaints, 'total_pages': 1}
+
+            def encode():
+                with flask_app.test_request_context(headers=headers):
+                    return flask_app.json.response(build())
+
+            response = encode()
+            with flask_app.test_request_context(headers=headers):
+                sizes[name] = len(compress_response(response, flask_app.config).get_data()
+                                  if flask_app.config['COMPRESS_ENABLED'] else response.get_data())
+
+            def compress():
+                with flask_app.test_request_context(headers=headers):
+                    compress_response(flask_app.response_class(body, mimetype='application/json'),
+                                      flask_app.config)
+
+            body = response.get_data()
+            encode_samples = cpu_times(encode, args.repeat)
+            compress_samples = cpu_times(compress, args.repeat) if flask_app.config['COMPRESS_ENABLED'] else []
+
+        client = flask_app.test_client()
+        auth = dict(headers, Authorization=f'Bearer {token}')
+        path = f'/api/complaints?limit={args.limit}'
+        client.get(path, headers=auth)  # warm up
+        request_samples = cpu_times(lambda: client.get(path, headers=auth), max(args.repeat // 10, 5))
+
+        results[f'encode {name}'] = common.summarize(encode_samples, 0, sum(encode_samples))
+        if compress_samples:
+            results[f'compress {name}'] = common.summarize(compress_samples, 0, sum(compress_samples))
+        results[f'request {name}'] = common.summarize(request_samples, 0, sum(request_samples))
+
+    print(f'admin list, {args.limit} complaints per page; times are CPU ms per response')
+    common.print_table(results)
+    print(f"body bytes: before {sizes['before']}, after {sizes['after']} "
+          f"({sizes['after'] / sizes['before']:.0%})")
+    for kind in ('encode', 'request'):
+        before, after = results[f'{kind} before']['p50_ms'], results[f'{kind} after']['p50_ms']
+        if after:
+            print(f'{kind}: p50 {before:.3f}ms -> {after:.3f}ms ({before / after:.1f}x)')
+
+    if args.save_baseline:
+        path = common.save_baseline(args.baseline, {
+            'config': {'complaints': args.complaints, 'limit': args.limit, 'accept_encoding': args.accept_encoding},
+            'environment': common.environment(),
+            'results': results,
+            'sizes': sizes,
+        })
+        print(f'Baseline saved to {path}', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""Shared helpers for the backend benchmarks: seeding, stubs, timing and baselines."""
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+CATEGORIES = ['accident', 'water', 'tree', 'infrastructure', 'electrical']
+STATUSES = ['pending', 'assigned', 'in_progress', 'completed', 'rejected']
+PRIORITIES = ['Critical', 'High', 'Medium', 'Low']
+DESCRIPTIONS = [
+    'Water pipe burst and the street is flooded near the market',
+    'Large tree fell across the road after the storm',
+    'Two cars collided at the junction, one person injured',
+    'Street light pole is sparking and wires are exposed',
+    'Deep crack on the bridge deck, vehicles still crossing',
+]
+
+# City-sized box around Visakhapatnam; any box works, it only has to be realistic.
+LAT_RANGE = (17.60, 17.85)
+LON_RANGE = (83.15, 83.40)
+
+PASSWORD = 'bench-password'
+
+
+def import_app(db_url):
+    """Import the backend and build an app using ``db_url`` as its database.
+
+    The backend reads its configuration from the environment, so that is set
+    first.
+    """
+    os.environ['DB'] = db_url
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    # Benchmarks send far more logins and submissions than the limits allow;
+    # timed 429s would say nothing about the endpoints.
+    os.environ['RATELIMIT_ENABLED'] = '0'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from app import create_app
+    return create_app({'SQLALCHEMY_DATABASE_URI': db_url, 'RATELIMIT_ENABLED': False})
+
+
+class _StubGeminiResponse:
+    text = json.dumps({
+        'title': 'Water pipe burst on main road',
+        'description': 'A water pipe has burst and the road is flooded.',
+        'category': 'water',
+        'image_severity_score': 0.4,
+    })
+
+
+class StubGeminiModel:
+    """Stands in for ``genai.GenerativeModel`` so no remote calls are made."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate_content(self, parts):
+        if self.latency:
+            time.sleep(self.latency)
+        return _StubGeminiResponse()
+
+
+def install_stubs(flask_app, gemini_latency=0.0, upload_dir=None):
+    """Replace Gemini and SMTP with local stubs and send uploads to a temp dir."""
+    import ml
+    from extensions import mail
+
+    ml.preload('gemini', StubGeminiModel(gemini_latency))
+    mail.send = lambda message: None
+    flask_app.config['UPLOAD_FOLDER'] = upload_dir or tempfile.mkdtemp(prefix='snapfix-bench-')
+
+
+def seed(flask_app, users, workers, complaints, rng=None):
+    """Populate an empty database and return the ids needed to issue tokens."""
+    import schema
+    import search
+    from extensions import bcrypt, db
+    from models import Complaint, ComplaintUpdate, User
+
+    rng = rng or random.Random(0)
+    # Hash once; bcrypt per row would dominate seeding time.
+    hashed = bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+    now = datetime.utcnow()
+
+    with flask_app.app_context():
+        search.drop_index()
+        db.drop_all()
+        schema.upgrade()
+
+        admin = User(name='Admin', email='admin@bench.local', password=hashed, role='admin')
+        db.session.add(admin)
+        db.session.flush()
+
+        db.session.bulk_insert_mappings(User, [{
+            'name': f'User {i}',
+            'email': f'user{i}@bench.local',
+            'phone': f'90000{i:05d}',
+            'password': hashed,
+            'role': 'user',
+            'latitude': str(rng.uniform(*LAT_RANGE)),
+            'longitude': str(rng.uniform(*LON_RANGE)),
+            'created_at': now - timedelta(days=rng.randint(0, 365)),
+        } for i in range(users)])
+        db.session.bulk_insert_mappings(User, [{
+            'name': f'Worker {i}',
+            'email': f'worker{i}@bench.local',
+            'phone': f'80000{i:05d}',
+            'password': hashed,
+            'role': 'worker',
+            'workload': 'Free',
+            'active_tasks': 0,
+            'latitude': str(rng.uniform(*LAT_RANGE)),
+            'longitude': str(rng.uniform(*LON_RANGE)),
+            'created_at': now - timedelta(days=rng.randint(0, 365)),
+        } for i in range(workers)])
+        db.session.flush()
+
+        user_ids = [row.id for row in db.session.query(User.id).filter_by(role='user')]
+        worker_ids = [row.id for row in db.session.query(User.id).filter_by(role='worker')]
+
+        batch = []
+        for i in range(complaints):
+            status = rng.choice(STATUSES)
+            created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+            lat, lon = rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+            batch.append({
+                'title': f'Complaint {i}',
+                'description': rng.choice(DESCRIPTIONS),
+                'category': rng.choice(CATEGORIES),
+                'status': status,
+                'priority': rng.choice(PRIORITIES),
+                'location': f'{lat:.6f}, {lon:.6f}',
+                'latitude': round(lat, 6),
+                'longitude': round(lon, 6),
+                'user_id': rng.choice(user_ids),
+                'worker_id': rng.choice(worker_ids) if worker_ids and status != 'pending' else None,
+                'created_at': created_at,
+                'updated_at': created_at,
+            })
+            if len(batch) == 5000:
+                db.session.bulk_insert_mappings(Complaint, batch)
+                batch = []
+        if batch:
+            db.session.bulk_insert_mappings(Complaint, batch)
+        db.session.flush()
+
+        complaint_ids = [row.id for row in db.session.query(Complaint.id).limit(1000)]
+        db.session.bulk_insert_mappings(ComplaintUpdate, [{
+            'complaint_id': complaint_id,
+            'message': 'Inspected the site',
+            'updated_by': rng.choice(worker_ids) if worker_ids else admin.id,
+            'created_at': now,
+        } for complaint_id in complaint_ids])
+        db.session.commit()
+        # Bulk inserts bypass the per-complaint index hooks.
+        search.rebuild_index()
+
+        return {
+            'admin_id': admin.id,
+            'user_ids': user_ids,
+            'worker_ids': worker_ids,
+            'complaint_ids': complaint_ids,
+        }
+
+
+def issue_token(flask_app, user_id):
+    from flask_jwt_extended import create_access_token
+
+    with flask_app.app_context():
+        return create_access_token(identity=str(user_id))
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies, errors, wall_time):
+    ordered = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'throughput_rps': round(len(latencies) / wall_time, 1) if wall_time else 0.0,
+    }
+
+
+def environment():
+    try:
+        revision = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                           stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'revision': revision,
+        'recorded_at': datetime.utcnow().isoformat(),
+    }
+
+
+def save_baseline(name, payload):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = os.path.join(BASELINE_DIR, f'{name}.json')
+    with open(path, 'w') as fh:
+        json.dump(payload, fh, indent=2, sort_keys=True)
+        fh.write('\n')
+    return path
+
+
+def load_baseline(name):
+    path = os.path.join(BASELINE_DIR, f'{name}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def compare(results, baseline, metric='p95_ms', tolerance=0.25):
+    """Return ``(key, baseline, current)`` for every entry slower than the baseline allows."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous or not previous.get(metric):
+            continue
+        if current[metric] > previous[metric] * (1 + tolerance):
+            regressions.append((key, previous[metric], current[metric]))
+    return regressions
+
+
+def print_table(results):
+    header = f"{'endpoint':<34}{'reqs':>7}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+    print(header)
+    print('-' * len(header))
+    for key, row in results.items():
+        print(f"{key:<34}{row['requests']:>7}{row['errors']:>6}{row['p50_ms']:>10.2f}"
+              f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['throughput_rps']:>10.1f}")
@@ -0,0 +1,120 @@
+"""Application configuration, read from the environment.
+
+Database pool settings are derived from the serving concurrency: every
+gunicorn worker process owns its own pool, and each of its ``WEB_THREADS``
+threads may hold one connection at a time.
+"""
+import os
+from datetime import timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _int_env(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _bool_env(name, default):
+    value = os.getenv(name)
+    if value in (None, ''):
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def web_workers():
+    """Worker processes per host; one per core, since inference is CPU bound."""
+    return _int_env('WEB_CONCURRENCY', os.cpu_count() or 1)
+
+
+def web_threads():
+    """Threads per worker; they mostly wait on Postgres, Gemini and SMTP."""
+    return _int_env('WEB_THREADS', 4)
+
+
+def engine_options(database_uri, threads=None):
+    """SQLAlchemy engine options sized for ``threads`` concurrent requests per process."""
+    if not database_uri or database_uri.startswith('sqlite'):
+        # SQLite pools are per-file/per-thread and reject the QueuePool knobs below.
+        return {}
+
+    threads = threads or web_threads()
+    return {
+        # One connection per request thread, plus headroom for bursts
+        # (e.g. a thread that also runs a background reconciliation query).
+        'pool_size': _int_env('DB_POOL_SIZE', threads),
+        'max_overflow': _int_env('DB_MAX_OVERFLOW', max(2, threads // 2)),
+        # Fail fast instead of queueing behind a saturated pool.
+        'pool_timeout': _int_env('DB_POOL_TIMEOUT', 10),
+        # Recycle before common proxy/firewall idle timeouts drop the socket.
+        'pool_recycle': _int_env('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _bool_env('DB_POOL_PRE_PING', True),
+    }
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = os.getenv('DB')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    JWT_SECRET_KEY = os.getenv('SECRET_KEY')
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
+
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(BASE_DIR, 'uploads'))
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+
+    MAIL_SERVER = 'smtp.gmail.com'
+    MAIL_PORT = 587
+    MAIL_USE_TLS = True
+    MAIL_USERNAME = os.getenv('GMAIL')
+    MAIL_PASSWORD = os.getenv('APP_PASS')  # App Password
+    MAIL_DEFAULT_SENDER = os.getenv('GMAIL')
+
+    CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')
+
+    # Seconds between background workload reconciliations; 0 disables the thread.
+    WORKLOAD_RECONCILE_INTERVAL = _int_env('WORKLOAD_RECONCILE_INTERVAL', 300)
+
+    # Near-duplicate detection on submission (see dedup.py).
+    DEDUP_ENABLED = _bool_env('DEDUP_ENABLED', True)
+    DEDUP_WINDOW_HOURS = _int_env('DEDUP_WINDOW_HOURS', 72)
+    DEDUP_RADIUS_KM = float(os.getenv('DEDUP_RADIUS_KM') or 0.5)
+    DEDUP_MIN_SIMILARITY = float(os.getenv('DEDUP_MIN_SIMILARITY') or 0.6)
+
+    # Seconds between full reloads of the heatmap index (see geo.py); 0 never reloads.
+    GEO_RELOAD_SECONDS = _int_env('GEO_RELOAD_SECONDS', 3600)
+
+    # Workers whose solved task order is kept per process (see routing.py).
+    ROUTE_CACHE_SIZE = _int_env('ROUTE_CACHE_SIZE', 1000)
+
+    # Archival of closed complaints (see archive.py): completed/rejected complaints
+    # untouched for ARCHIVE_AFTER_DAYS are moved to the archive tables, in batches.
+    ARCHIVE_AFTER_DAYS = _int_env('ARCHIVE_AFTER_DAYS', 180)
+    ARCHIVE_BATCH_SIZE = _int_env('ARCHIVE_BATCH_SIZE', 500)
+
+    # Response encoding (see responses.py).
+    FAST_JSON = _bool_env('FAST_JSON', True)
+    COMPRESS_ENABLED = _bool_env('COMPRESS_ENABLED', True)
+    COMPRESS_MIN_SIZE = _int_env('COMPRESS_MIN_SIZE', 1024)  # bytes
+    COMPRESS_GZIP_LEVEL = _int_env('COMPRESS_GZIP_LEVEL', 6)
+    COMPRESS_BROTLI_QUALITY = _int_env('COMPRESS_BROTLI_QUALITY', 4)
+
+    # Token-bucket limits per rule (see ratelimit.py): "N/period", e.g. "10/minute" or "5/30s".
+    # An empty value or "off" disables a rule.
+    RATELIMIT_ENABLED = _bool_env('RATELIMIT_ENABLED', True)
+    RATELIMIT_STORAGE_URL = os.getenv('RATELIMIT_STORAGE_URL', 'memory://')  # or redis://host:6379/0
+    RATELIMIT_MAX_KEYS = _int_env('RATELIMIT_MAX_KEYS', 100_000)  # per process, memory storage only
+    # Reverse proxies in front of the app that append to X-Forwarded-For; 0 uses the socket address.
+    RATELIMIT_PROXY_COUNT = _int_env('RATELIMIT_PROXY_COUNT', 0)
+    RATE_LIMITS = {
+        'login': os.getenv('RATELIMIT_LOGIN', '10/minute'),
+        'autofill': os.getenv('RATELIMIT_AUTOFILL', '30/hour'),
+        'send_mail': os.getenv('RATELIMIT_SEND_MAIL', '20/hour'),
+        'create_complaint': os.getenv('RATELIMIT_CREATE_COMPLAINT', '20/hour'),
+    }
+
+    # Run the models once at startup so the first requests don't pay for lazy setup.
+    WARMUP = _bool_env('WARMUP', False)
@@ -0,0 +1,45 @@
+"""Shared fixtures for the backend tests.
+
+``make_app`` builds an app on a fresh SQLite file with the schema in place;
+each test module seeds it with what it needs. ``auth_header`` turns a user
+into an ``Authorization`` header (inside an app context).
+"""
+import pytest
+from flask_jwt_extended import create_access_token
+
+import schema
+from app import create_app
+from extensions import db
+
+JWT_SECRET_KEY = 'test-secret-key-0123456789abcdef'
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    apps = []
+
+    def make(**overrides):
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / f'test{len(apps)}.sqlite3'}",
+            'JWT_SECRET_KEY': JWT_SECRET_KEY,
+            'UPLOAD_FOLDER': str(tmp_path),
+            'WORKLOAD_RECONCILE_INTERVAL': 0,
+            **overrides,
+        })
+        with app.app_context():
+            schema.upgrade()
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def auth_header():
+    def header(user):
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    return header
@@ -0,0 +1,290 @@
+"""Near-duplicate detection for new complaints.
+
+A burst pipe produces dozens of reports of the same incident. Each new
+complaint is compared against recent open complaints nearby: candidates come
+from an in-memory index bucketed into geographic grid cells, and text
+similarity is the cosine of the TF-IDF vectors the priority model already
+computes (the vectorizer L2-normalises rows, so a sparse matrix product gives
+the cosines directly). A likely duplicate is linked to the original's root
+complaint through ``parent_id`` instead of being dispatched on its own.
+
+The index is per process and only covers ``DEDUP_WINDOW_HOURS``. It is filled
+from the database on first use and then catches up with rows created by other
+processes before every check, reading only those created since the newest one
+it has seen (less ``SYNC_OVERLAP``), so it never scans the table.
+Matching is best effort: ``find_parent`` re-checks the parent in the database.
+"""
+import logging
+import math
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+import ml
+from extensions import db
+from models import Complaint
+
+logger = logging.getLogger('snapfix.dedup')
+
+# Complaints a new report may be folded into.
+OPEN_STATUSES = ('pending', 'assigned', 'in_progress')
+DUPLICATE = 'duplicate'
+CLOSED_STATUSES = ('completed', 'rejected')
+
+EARTH_RADIUS_KM = 6371  # as in scoring.haversine
+KM_PER_DEGREE = 111.32
+# Re-read complaints created this long before the newest one seen. Ids and
+# created_at are assigned at insert, so a transaction that commits late can
+# add a row older than ones already indexed.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class _Entry:
+    # Just the nonzeros of the TF-IDF row, as two small arrays rather than a
+    # scipy matrix. With its share of the stacked cell that is still about
+    # 1KB an entry (bench_dedup.py's 100k entries measure roughly 100MB).
+    __slots__ = ('id', 'root_id', 'latitude', 'longitude', 'indices', 'data', 'cell')
+
+    def __init__(self, complaint_id, root_id, latitude, longitude, vector, cell):
+        self.id = complaint_id
+        self.root_id = root_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.indices = vector.indices.astype('int32')
+        self.data = vector.data.astype('float32')
+        self.cell = cell
+
+
+class _Cell:
+    """Entries of one category in one grid cell, stacked into arrays on demand."""
+
+    __slots__ = ('entries', 'width', '_stacked')
+
+    def __init__(self, width):
+        self.entries = {}
+        self.width = width
+        self._stacked = None
+
+    def add(self, entry):
+        self.entries[entry.id] = entry
+        self._stacked = None
+
+    def remove(self, complaint_id):
+        self.entries.pop(complaint_id, None)
+        self._stacked = None
+
+    def stacked(self):
+        """``(matrix, latitudes, longitudes, root_ids)``: one TF-IDF row and coordinate per entry."""
+        if self._stacked is None:
+            import numpy as np
+            from scipy.sparse import csr_matrix
+            entries = list(self.entries.values())
+            indptr = np.cumsum([0] + [len(entry.indices) for entry in entries])
+            matrix = csr_matrix((np.concatenate([entry.data for entry in entries]),
+                                 np.concatenate([entry.indices for entry in entries]), indptr),
+                                shape=(len(entries), self.width))
+            self._stacked = (
+                matrix,
+                np.radians([entry.latitude for entry in entries]),
+                np.radians([entry.longitude for entry in entries]),
+                np.array([entry.root_id for entry in entries]),
+            )
+        return self._stacked
+
+
+class DuplicateIndex:
+    """Time-windowed, grid-bucketed index of recent open complaints."""
+
+    def __init__(self, window_hours=72, radius_km=0.5, min_similarity=0.6):
+        self.window = timedelta(hours=window_hours)
+        self.radius_km = radius_km
+        self.min_similarity = min_similarity
+        self._cell_deg = radius_km / KM_PER_DEGREE
+        self._entries = {}
+        self._children = {}  # root id -> ids of the duplicates linked to it
+        self._cells = {}
+        self._expiry = deque()  # (created_at, id), roughly oldest first
+        self._newest = None  # latest created_at indexed
+        self._recent = {}  # id -> created_at of what was indexed within SYNC_OVERLAP of _newest
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _cell(self, category, latitude, longitude):
+        return category, int(latitude // self._cell_deg), int(longitude // self._cell_deg)
+
+    def _neighbourhood(self, category, latitude, longitude):
+        """Cells that can hold points within ``radius_km``. A degree of longitude
+        shrinks towards the poles, so more columns than rows are needed."""
+        _, row, col = self._cell(category, latitude, longitude)
+        spread = math.ceil(1 / max(math.cos(math.radians(latitude)), 0.01))
+        return [(category, row + dr, col + dc) for dr in (-1, 0, 1) for dc in range(-spread, spread + 1)]
+
+    def add(self, complaint_id, root_id, category, latitude, longitude, created_at, vector):
+        """Index one complaint; ``vector`` is its 1 x n TF-IDF row."""
+        with self._lock:
+            self._add(complaint_id, root_id, category, latitude, longitude, created_at, vector)
+
+    def _add(self, complaint_id, root_id, category, latitude, longitude, created_at, vector):
+        if complaint_id in self._entries or latitude is None or longitude is None:
+            return
+        self._recent[complaint_id] = created_at
+        if self._newest is None or created_at > self._newest:
+            self._newest = created_at
+        cell = self._cell(category, latitude, longitude)
+        entry = _Entry(complaint_id, root_id, latitude, longitude, vector, cell)
+        self._entries[complaint_id] = entry
+        if root_id != complaint_id:
+            self._children.setdefault(root_id, set()).add(complaint_id)
+        if cell not in self._cells:
+            self._cells[cell] = _Cell(vector.shape[1])
+        self._cells[cell].add(entry)
+        self._expiry.append((created_at, complaint_id))
+
+    def discard(self, complaint_id):
+        """Forget a complaint (closed or deleted) and any duplicates linked to it."""
+        with self._lock:
+            for linked_id in self._children.get(complaint_id, set()) | {complaint_id}:
+                entry = self._entries.get(linked_id)
+                if entry is not None:
+                    self._remove(entry)
+
+    def _remove(self, entry):
+        del self._entries[entry.id]
+        siblings = self._children.get(entry.root_id)
+        if siblings is not None:
+            siblings.discard(entry.id)
+            if not siblings:
+                del self._children[entry.root_id]
+        cell = self._cells[entry.cell]
+        cell.remove(entry.id)
+        if not cell.entries:
+            del self._cells[entry.cell]
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, complaint_id = self._expiry.popleft()
+            entry = self._entries.get(complaint_id)
+            if entry is not None:
+                self._remove(entry)
+
+    def candidates(self, category, latitude, longitude, vector, now=None, limit=5):
+        """Return up to ``limit`` ``(root_id, similarity, distance_km)`` tuples for likely
+        duplicates, best first. ``vector`` is the new report's 1 x n TF-IDF row."""
+        import numpy as np
+
+        now = now or datetime.utcnow()
+        query = vector.toarray().ravel()
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        found = []
+        with self._lock:
+            self._expire(now)
+            for key in self._neighbourhood(category, latitude, longitude):
+                cell = self._cells.get(key)
+                if cell is None:
+                    continue
+                matrix, lats, lons, roots = cell.stacked()
+                similarity = matrix @ query
+                keep = similarity >= self.min_similarity
+                if not keep.any():
+                    continue
+                similarity, lats, lons, roots = similarity[keep], lats[keep], lons[keep], roots[keep]
+                # Vectorised scoring.haversine.
+                a = (np.sin((lats - lat) / 2) ** 2
+                     + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2)
+                distance = 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+                near = distance <= self.radius_km
+                if near.any():
+                    found.append((similarity[near], distance[near], roots[near]))
+        if not found:
+            return []
+        similarity, distance, roots = (np.concatenate(column) for column in zip(*found))
+        # Prefer the closer report when the wording is about as similar.
+        score = similarity * (1 - 0.5 * distance / self.radius_km)
+        order = np.argsort(-score, kind='stable')
+        _, first = np.unique(roots[order], return_index=True)
+        best = order[np.sort(first)][:limit]
+        return [(int(roots[i]), float(similarity[i]), float(distance[i])) for i in best]
+
+    def sync(self, vectorize, now=None):
+        """Load complaints this process hasn't seen yet; ``vectorize`` maps texts to TF-IDF rows.
+
+        Returns the number of complaints added.
+        """
+        now = now or datetime.utcnow()
+        with self._lock:
+            loaded = self._newest is not None
+            since = now - self.window
+            if loaded:
+                since = max(since, self._newest - SYNC_OVERLAP)
+                self._recent = {complaint_id: created_at for complaint_id, created_at in self._recent.items()
+                                if created_at >= since}
+            rows = (db.session.query(Complaint.id, Complaint.parent_id, Complaint.category,
+                                     Complaint.latitude, Complaint.longitude, Complaint.created_at,
+                                     Complaint.description)
+                    .filter(Complaint.status.in_(OPEN_STATUSES + (DUPLICATE,)),
+                            Complaint.latitude.isnot(None),
+                            Complaint.created_at >= since)
+                    .order_by(Complaint.created_at, Complaint.id)
+                    .all())
+            # Skip what the overlap reads again, including entries discarded since.
+            rows = [row for row in rows if row.id not in self._recent]
+            if rows:
+                vectors = vectorize([row.description for row in rows])
+                for position, row in enumerate(rows):
+                    self._add(row.id, row.parent_id or row.id, row.category, row.latitude, row.longitude,
+                              row.created_at, vectors[position])
+            if not loaded:
+                logger.info('duplicate index loaded', extra={'complaints': len(rows)})
+                if self._newest is None:
+                    self._newest = now  # nothing open yet: start the overlap from here
+            return len(rows)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(config):
+    """The process-wide index, built from the app's ``DEDUP_*`` settings on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DuplicateIndex(window_hours=config['DEDUP_WINDOW_HOURS'],
+                                        radius_km=config['DEDUP_RADIUS_KM'],
+                                        min_similarity=config['DEDUP_MIN_SIMILARITY'])
+    return _index
+
+
+def reset_index():
+    """Drop the process-wide index (tests and benchmarks switch databases)."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def find_parent(config, category, latitude, longitude, vector, now=None):
+    """Return ``(parent, similarity, distance_km)`` for the open incident a new report
+    duplicates, or ``None``. ``vector`` is the report's TF-IDF row."""
+    if latitude is None or longitude is None:
+        return None
+    index = get_index(config)
+    index.sync(ml.tfidf_vectorizer().transform, now)
+    for root_id, similarity, distance in index.candidates(category, latitude, longitude, vector, now):
+        # Another process may have closed or deleted it since it was indexed.
+        parent = db.session.get(Complaint, root_id)
+        if parent is not None and parent.status in OPEN_STATUSES:
+            return parent, similarity, distance
+        index.discard(root_id)
+    return None
+
+
+def remember(config, complaint, vector):
+    """Index a complaint this process just committed, so the next check sees it without a query."""
+    if complaint.latitude is None:
+        return
+    get_index(config).add(complaint.id, complaint.parent_id or complaint.id, complaint.category,
+                          complaint.latitude, complaint.longitude, complaint.created_at, vector)
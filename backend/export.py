@@ -0,0 +1,177 @@
+"""Streaming export of complaints with their people and update history.
+
+Rows are read through a server-side cursor (``yield_per``; psycopg2 uses a
+named cursor on Postgres) in batches of ``EXPORT_BATCH``. Each batch's
+update history is fetched with one ``IN`` query, encoded, and handed to the
+response before the next batch is read. Memory use therefore stays the same
+whatever the table size. Core rows are used instead of ORM objects, so
+nothing builds up in the session's identity map. Archived complaints are
+included (see ``archive.all_complaints``).
+
+Rows are ordered by ``(updated_at, id)``, and every record carries the
+cursor for its position. Passing the last cursor received as ``since``
+resumes an interrupted download, or fetches only what changed since the
+previous pull. Rows changed in the last ``SETTLE_SECONDS`` are held back
+until the next pull. A transaction that commits a little after it stamped
+``updated_at`` then can't slip in behind a cursor that was already handed
+out.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import aliased
+
+import archive
+import search
+from extensions import db
+from models import User
+
+EXPORT_BATCH = 1000
+SETTLE_SECONDS = 60
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+CSV_FIELDS = [
+    'id', 'title', 'description', 'category', 'status', 'priority', 'location', 'latitude', 'longitude',
+    'image_url', 'parent_id', 'user_id', 'user_name', 'user_email', 'worker_id', 'worker_name',
+    'created_at', 'updated_at', 'updates', 'cursor',
+]
+
+
+class ExportError(ValueError):
+    """Invalid export parameters; the message is safe to show to the client."""
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _batches(statuses=None, date_from=None, date_to=None, since=None, until=None):
+    complaints = archive.all_complaints().c
+    worker = aliased(User)
+    stmt = (select(complaints.id, complaints.title, complaints.description, complaints.category,
+                   complaints.status, complaints.priority, complaints.location, complaints.latitude,
+                   complaints.longitude, complaints.image_url, complaints.parent_id, complaints.created_at,
+                   complaints.updated_at, complaints.user_id, User.name.label('user_name'),
+                   User.email.label('user_email'), complaints.worker_id, worker.name.label('worker_name'))
+            .join(User, complaints.user_id == User.id)
+            .outerjoin(worker, complaints.worker_id == worker.id)
+            .order_by(complaints.updated_at, complaints.id))
+    if statuses:
+        stmt = stmt.where(complaints.status.in_(statuses))
+    if date_from:
+        stmt = stmt.where(complaints.created_at >= date_from)
+    if date_to:
+        stmt = stmt.where(complaints.created_at < date_to)
+    if since:
+        last_updated, last_id = since
+        stmt = stmt.where(or_(complaints.updated_at > last_updated,
+                              and_(complaints.updated_at == last_updated, complaints.id > last_id)))
+    if until:
+        stmt = stmt.where(complaints.updated_at < until)
+
+    log = archive.all_updates().c
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH))
+    try:
+        for rows in result.partitions():
+            history = {}
+            updates = db.session.execute(
+                select(log.complaint_id, log.id, log.message, log.created_at, User.name.label('updated_by'))
+                .join(User, log.updated_by == User.id)
+                .where(log.complaint_id.in_([row.id for row in rows]))
+                .order_by(log.complaint_id, log.created_at, log.id)
+            )
+            for update in updates:
+                history.setdefault(update.complaint_id, []).append({
+                    'id': update.id,
+                    'message': update.message,
+                    'updated_by': update.updated_by,
+                    'created_at': _isoformat(update.created_at),
+                })
+            yield [(row, history.get(row.id, [])) for row in rows]
+    finally:
+        result.close()
+
+
+def _record(row, updates):
+    return {
+        'id': row.id,
+        'title': row.title,
+        'description': row.description,
+        'category': row.category,
+        'status': row.status,
+        'priority': row.priority,
+        'location': row.location,
+        'latitude': row.latitude,
+        'longitude': row.longitude,
+        'image_url': row.image_url,
+        'parent_id': row.parent_id,
+        'user': {'id': row.user_id, 'name': row.user_name, 'email': row.user_email},
+        'worker': {'id': row.worker_id, 'name': row.worker_name} if row.worker_id else None,
+        'created_at': _isoformat(row.created_at),
+        'updated_at': _isoformat(row.updated_at),
+        'updates': updates,
+        'cursor': search.encode_cursor(search.UPDATED, row.updated_at, row.id),
+    }
+
+
+def _ndjson(batches):
+    for batch in batches:
+        yield ''.join(json.dumps(_record(row, updates), separators=(',', ':')) + '\n'
+                      for row, updates in batch)
+
+
+def _csv(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for batch in batches:
+        for row, updates in batch:
+            record = _record(row, updates)
+            user, worker = record.pop('user'), record.pop('worker') or {}
+            record.update(user_id=user['id'], user_name=user['name'], user_email=user['email'],
+                          worker_id=worker.get('id'), worker_name=worker.get('name'),
+                          updates=json.dumps(record['updates'], separators=(',', ':')))
+            writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def parse_since(value):
+    """Decode a ``since`` cursor into ``(updated_at, id)``."""
+    try:
+        updated_at, complaint_id = search.decode_cursor(value, search.UPDATED)
+    except search.SearchError:
+        raise ExportError("Invalid 'since' cursor")
+    return updated_at, complaint_id
+
+
+def stream_complaints(fmt='ndjson', compress=False, statuses=None, date_from=None, date_to=None,
+                      since=None, now=None):
+    """Return a generator of response body chunks (``str``, or ``bytes`` when compressed).
+
+    Must be consumed inside an app context, e.g. wrapped in ``stream_with_context``.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"'format' must be one of: {', '.join(FORMATS)}")
+    until = (now or datetime.utcnow()) - timedelta(seconds=SETTLE_SECONDS)
+    batches = _batches(statuses, date_from, date_to, since, until)
+    chunks = _ndjson(batches) if fmt == 'ndjson' else _csv(batches)
+    return _gzip(chunks) if compress else chunks
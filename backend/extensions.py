@@ -0,0 +1,12 @@
+"""Flask extensions, created unbound and attached to an app in create_app()."""
+from flask_bcrypt import Bcrypt
+from flask_cors import CORS
+from flask_jwt_extended import JWTManager
+from flask_mail import Mail
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+bcrypt = Bcrypt()
+jwt = JWTManager()
+mail = Mail()
+cors = CORS()
@@ -0,0 +1,377 @@
+"""Tile aggregation of complaint locations for the admin heatmap.
+
+Complaints are binned into Web Mercator ``zoom/x/y`` tiles (the scheme map
+libraries such as Leaflet use), with counts per status, category and
+priority in each tile. Coordinates and codes are held in numpy columns, so
+building a zoom level is one sort plus a few ``bincount`` calls, however many
+complaints there are. Each zoom level is then cached, and so is the JSON-ready
+dict for each tile.
+
+The index is per process. It is loaded from the database on first use and
+then kept current from ``complaints.updated_at``. Every create and update
+sets that column, so each request reads only the rows changed since the last
+one and re-bins them. Rows deleted by another process are dropped at the next
+full reload (``GEO_RELOAD_SECONDS``). That reload is built in a background
+thread while requests keep using the current index, and swapped in under the
+lock when it is ready. Archived complaints are loaded too;
+archiving doesn't change a complaint, so the index needs no update for it.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+import archive
+from extensions import db
+from models import Complaint
+
+logger = logging.getLogger('snapfix.geo')
+
+MAX_ZOOM = 20
+CACHED_ZOOMS = 8
+DIMENSIONS = ('status', 'category', 'priority')
+UNKNOWN = 'unknown'
+LOAD_BATCH = 50000
+# Re-read rows updated this long before the newest one seen, to catch
+# transactions that committed after a sync but stamped an earlier time.
+SYNC_OVERLAP = timedelta(seconds=60)
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def tile_xy(latitudes, longitudes, zoom):
+    """Vectorised Web Mercator tile coordinates for arrays of degrees."""
+    import numpy as np
+
+    n = 1 << zoom
+    lat = np.radians(np.clip(latitudes, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = np.floor((np.asarray(longitudes) + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat)) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def tile_center(x, y, zoom):
+    n = 1 << zoom
+    lon = (x + 0.5) / n * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / n))))
+    return round(lat, 6), round(lon, 6)
+
+
+class _ZoomTiles:
+    """Counts for every non-empty tile at one zoom level."""
+
+    def __init__(self, zoom, keys, totals, counts):
+        self.zoom = zoom
+        self.keys = list(keys)
+        self.row_of = {key: row for row, key in enumerate(self.keys)}
+        self.totals = totals
+        self.counts = counts  # dimension -> 2-D array, tiles x codes
+        self.features = [None] * len(self.keys)
+
+    def add(self, key, codes, delta):
+        import numpy as np
+
+        row = self.row_of.get(key)
+        if row is None:
+            row = self.row_of[key] = len(self.keys)
+            self.keys.append(key)
+            self.features.append(None)
+            self.totals = np.append(self.totals, 0)
+            for dimension, matrix in self.counts.items():
+                self.counts[dimension] = np.vstack([matrix, np.zeros((1, matrix.shape[1]), np.int64)])
+        self.totals[row] += delta
+        for dimension, code in zip(DIMENSIONS, codes):
+            matrix = self.counts[dimension]
+            if code >= matrix.shape[1]:
+                matrix = self.counts[dimension] = np.pad(matrix, ((0, 0), (0, code + 1 - matrix.shape[1])))
+            matrix[row, code] += delta
+        self.features[row] = None
+
+    def feature(self, row, labels):
+        feature = self.features[row]
+        if feature is None:
+            key = self.keys[row]
+            x, y = key >> 32, key & 0xFFFFFFFF
+            lat, lon = tile_center(x, y, self.zoom)
+            feature = {'tile': f'{self.zoom}/{x}/{y}', 'x': x, 'y': y, 'lat': lat, 'lon': lon,
+                       'count': int(self.totals[row])}
+            for dimension in DIMENSIONS:
+                counts = self.counts[dimension][row]
+                feature[dimension] = {labels[dimension][code]: int(counts[code]) for code in counts.nonzero()[0]}
+            self.features[row] = feature
+        return feature
+
+
+class GeoIndex:
+    """Columnar copy of complaint coordinates and codes, binned per zoom on demand."""
+
+    def __init__(self, reload_seconds=3600):
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._reloading = None  # ids forgotten while a background reload runs
+        self._reloader = None
+        self._reset()
+
+    def _reset(self):
+        import numpy as np
+
+        self._size = 0
+        self._ids = np.zeros(0, np.int64)
+        self._lat = np.zeros(0)
+        self._lon = np.zeros(0)
+        self._codes = np.zeros((0, len(DIMENSIONS)), np.int32)
+        self._alive = np.zeros(0, bool)
+        self._sorted = 0  # rows [0, _sorted) are ordered by id (the bulk load)
+        self._tail = {}  # id -> row for rows appended since the load
+        self._codes_of = {dimension: {} for dimension in DIMENSIONS}
+        self._labels = {dimension: [] for dimension in DIMENSIONS}
+        self._zooms = OrderedDict()
+        self._watermark = None
+        self._loaded_at = None
+
+    def __len__(self):
+        return int(self._alive[:self._size].sum())
+
+    def _code(self, dimension, value):
+        value = value or UNKNOWN
+        code = self._codes_of[dimension].get(value)
+        if code is None:
+            code = self._codes_of[dimension][value] = len(self._labels[dimension])
+            self._labels[dimension].append(value)
+        return code
+
+    def _grow(self, needed):
+        import numpy as np
+
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        for name in ('_ids', '_lat', '_lon', '_alive'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+        codes = np.zeros((capacity, len(DIMENSIONS)), np.int32)
+        codes[:self._size] = self._codes[:self._size]
+        self._codes = codes
+
+    def _row(self, complaint_id):
+        import numpy as np
+
+        row = self._tail.get(complaint_id)
+        if row is not None:
+            return row
+        row = int(np.searchsorted(self._ids[:self._sorted], complaint_id))
+        if row < self._sorted and self._ids[row] == complaint_id:
+            return row
+        return None
+
+    def _key(self, zoom, row):
+        x, y = tile_xy(self._lat[row:row + 1], self._lon[row:row + 1], zoom)
+        return (int(x[0]) << 32) | int(y[0])
+
+    def _bin(self, row, delta):
+        codes = tuple(int(code) for code in self._codes[row])
+        for zoom, tiles in self._zooms.items():
+            tiles.add(self._key(zoom, row), codes, delta)
+
+    def load(self):
+        """Replace the index with every located complaint in the database, archived ones included."""
+        complaints = archive.all_complaints().c
+        query = (select(complaints.id, complaints.latitude, complaints.longitude, complaints.status,
+                        complaints.category, complaints.priority, complaints.updated_at)
+                 .where(complaints.latitude.isnot(None), complaints.longitude.isnot(None))
+                 .order_by(complaints.id)
+                 .execution_options(yield_per=LOAD_BATCH))
+        self.load_rows(db.session.execute(query))
+
+    def load_rows(self, rows):
+        """Replace the index with ``rows`` (id, latitude, longitude, status, category,
+        priority, updated_at), which must be ordered by id."""
+        started = time.perf_counter()
+        self._reset()
+        watermark = None
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == LOAD_BATCH:
+                watermark = self._append_batch(batch, watermark)
+                batch = []
+        watermark = self._append_batch(batch, watermark)
+        self._sorted = self._size
+        self._alive[:self._size] = True
+        self._watermark = watermark
+        self._loaded_at = time.monotonic()
+        logger.info('geo index loaded', extra={'complaints': self._size,
+                                               'duration_ms': round((time.perf_counter() - started) * 1000, 2)})
+
+    def _append_batch(self, rows, watermark):
+        import numpy as np
+
+        if not rows:
+            return watermark
+        start, end = self._size, self._size + len(rows)
+        self._grow(end)
+        self._ids[start:end] = [row.id for row in rows]
+        self._lat[start:end] = [row.latitude for row in rows]
+        self._lon[start:end] = [row.longitude for row in rows]
+        self._codes[start:end] = np.array(
+            [[self._code('status', row.status), self._code('category', row.category),
+              self._code('priority', row.priority)] for row in rows], np.int32)
+        self._size = end
+        latest = max((row.updated_at for row in rows if row.updated_at is not None), default=None)
+        if latest is not None and (watermark is None or latest > watermark):
+            watermark = latest
+        return watermark
+
+    def upsert(self, complaint_id, latitude, longitude, status, category, priority):
+        """Apply the current values of one complaint (idempotent)."""
+        row = self._row(complaint_id)
+        if row is not None and self._alive[row]:
+            codes = tuple(self._codes_of[dimension].get(value or UNKNOWN)
+                          for dimension, value in zip(DIMENSIONS, (status, category, priority)))
+            if (self._lat[row], self._lon[row]) == (latitude, longitude) and tuple(self._codes[row]) == codes:
+                return  # unchanged; keep the cached tiles
+            self._bin(row, -1)
+        if latitude is None or longitude is None:
+            if row is not None:
+                self._alive[row] = False
+            return
+        if row is None:
+            row = self._size
+            self._grow(row + 1)
+            self._size += 1
+            self._ids[row] = complaint_id
+            self._tail[complaint_id] = row
+        self._lat[row], self._lon[row] = latitude, longitude
+        self._codes[row] = (self._code('status', status), self._code('category', category),
+                            self._code('priority', priority))
+        self._alive[row] = True
+        self._bin(row, 1)
+
+    def _forget(self, complaint_id):
+        row = self._row(complaint_id)
+        if row is not None and self._alive[row]:
+            self._bin(row, -1)
+            self._alive[row] = False
+
+    def forget(self, complaint_id):
+        with self._lock:
+            self._forget(complaint_id)
+            if self._reloading is not None:
+                self._reloading.add(complaint_id)
+
+    def _start_reload(self, app):
+        """Build a fresh index in a daemon thread and swap it in when it is loaded."""
+        self._reloading = set()
+
+        def reload():
+            fresh = GeoIndex(self.reload_seconds)
+            try:
+                with app.app_context():
+                    fresh.load()
+            except Exception:
+                logger.exception('geo index reload failed')
+                with self._lock:
+                    self._reloading = None
+                    self._loaded_at = time.monotonic()  # retry after another interval
+                return
+            with self._lock:
+                for complaint_id in self._reloading:
+                    fresh._forget(complaint_id)
+                for name, value in vars(fresh).items():
+                    if name not in ('_lock', '_reloading', '_reloader'):
+                        setattr(self, name, value)
+                self._reloading = None
+
+        self._reloader = threading.Thread(target=reload, name='geo-reload', daemon=True)
+        self._reloader.start()
+
+    def sync(self):
+        """Load the index, or apply the rows changed since the last sync.
+
+        The first call loads the index before returning. Once it is older than
+        ``reload_seconds``, a replacement is built in the background; until it
+        is swapped in, syncs keep updating the current one.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                self.load()
+                return
+            if (self.reload_seconds and self._reloading is None
+                    and time.monotonic() - self._loaded_at > self.reload_seconds):
+                self._start_reload(current_app._get_current_object())
+            query = db.session.query(Complaint.id, Complaint.latitude, Complaint.longitude, Complaint.status,
+                                     Complaint.category, Complaint.priority, Complaint.updated_at)
+            if self._watermark is not None:
+                query = query.filter(Complaint.updated_at >= self._watermark - SYNC_OVERLAP)
+            for row in query:
+                self.upsert(row.id, row.latitude, row.longitude, row.status, row.category, row.priority)
+                if row.updated_at is not None and (self._watermark is None or row.updated_at > self._watermark):
+                    self._watermark = row.updated_at
+
+    def _tiles(self, zoom):
+        import numpy as np
+
+        tiles = self._zooms.get(zoom)
+        if tiles is not None:
+            self._zooms.move_to_end(zoom)
+            return tiles
+        alive = self._alive[:self._size]
+        x, y = tile_xy(self._lat[:self._size][alive], self._lon[:self._size][alive], zoom)
+        keys, inverse = np.unique((x << 32) | y, return_inverse=True)
+        codes = self._codes[:self._size][alive]
+        counts = {}
+        for column, dimension in enumerate(DIMENSIONS):
+            width = max(len(self._labels[dimension]), 1)
+            counts[dimension] = np.bincount(inverse * width + codes[:, column],
+                                            minlength=len(keys) * width).reshape(len(keys), width)
+        tiles = _ZoomTiles(zoom, keys.tolist(), np.bincount(inverse, minlength=len(keys)), counts)
+        self._zooms[zoom] = tiles
+        if len(self._zooms) > CACHED_ZOOMS:
+            self._zooms.popitem(last=False)
+        return tiles
+
+    def heatmap(self, zoom, bbox=None):
+        """Non-empty tiles at ``zoom``, optionally only those overlapping ``bbox``
+        (``min_lat, min_lon, max_lat, max_lon``)."""
+        with self._lock:
+            tiles = self._tiles(zoom)
+            if bbox is not None:
+                min_lat, min_lon, max_lat, max_lon = bbox
+                (x0, x1), (y1, y0) = tile_xy([min_lat, max_lat], [min_lon, max_lon], zoom)
+                x0, x1, y0, y1 = int(x0), int(x1), int(y0), int(y1)
+            result = []
+            for row, key in enumerate(tiles.keys):
+                if not tiles.totals[row]:
+                    continue
+                if bbox is not None and not (x0 <= key >> 32 <= x1 and y0 <= key & 0xFFFFFFFF <= y1):
+                    continue
+                result.append(tiles.feature(row, self._labels))
+            return result
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(config):
+    """The process-wide index, created from the app's ``GEO_*`` settings on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = GeoIndex(reload_seconds=config['GEO_RELOAD_SECONDS'])
+    return _index
+
+
+def reset_index():
+    """Drop the process-wide index (tests and benchmarks switch databases)."""
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,81 @@
+"""Gunicorn settings for production: ``gunicorn -c gunicorn.conf.py wsgi:app``.
+
+The app is preloaded in the master so the pickled models are loaded once and
+shared copy-on-write by every forked worker. Each worker then opens its own
+database pool, sized from ``WEB_THREADS`` (see config.engine_options).
+
+Environment:
+    PORT             listen port (default 5000)
+    WEB_CONCURRENCY  worker processes (default: one per CPU core)
+    WEB_THREADS      threads per worker (default 4)
+    WEB_TIMEOUT      seconds before a silent worker is restarted (default 60)
+    METRICS_DIR      where workers share /metrics snapshots (default: a folder
+                     per port under the temp dir; empty: don't share; see metrics.py)
+"""
+import os
+import tempfile
+
+# Config reads the environment when it is first imported, so this has to come
+# before the import below for the preloaded app to warm up.
+os.environ.setdefault('WARMUP', '1')
+
+from config import web_threads, web_workers  # noqa: E402
+
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f"snapfix-metrics-{os.getenv('PORT', '5000')}"))
+# Set but empty: each worker serves only its own metrics (as metrics.init_app reads it).
+METRICS_DIR = os.environ['METRICS_DIR'] or None
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = web_workers()
+threads = web_threads()
+worker_class = 'gthread'
+preload_app = True
+
+# Gemini calls can take several seconds; leave room before the arbiter kills a worker.
+timeout = int(os.getenv('WEB_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth; jitter avoids restarting all at once.
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '5000'))
+max_requests_jitter = max_requests // 10
+
+accesslog = None
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+
+def on_starting(server):
+    import metrics
+    if METRICS_DIR:
+        metrics.clear_snapshots(METRICS_DIR)
+
+
+def post_fork(server, worker):
+    import metrics
+    import workload
+    from app import db, warmup_db
+
+    app = worker.app.wsgi()
+    with app.app_context():
+        # Drop any pooled connection inherited from the master without closing
+        # the master's socket, then open this worker's own pool.
+        db.engine.dispose(close=False)
+    warmup_db(app)
+    # Whatever the master recorded while preloading would otherwise count once per worker.
+    metrics.registry.reset()
+    # Idempotent, so running it in every worker only costs one grouped query each.
+    workload.start_reconciler(app)
+    metrics.start_exporter(app)
+
+
+def worker_exit(server, worker):
+    import metrics
+    if METRICS_DIR:
+        metrics.write_snapshot(METRICS_DIR)
+
+
+def child_exit(server, worker):
+    import metrics
+    if METRICS_DIR:
+        metrics.fold_exited(METRICS_DIR, worker.pid)
@@ -0,0 +1,80 @@
+"""Structured, leveled logging for the backend.
+
+Records are emitted as one JSON object per line so they can be grepped locally
+and shipped to a log collector unchanged. Anything passed through ``extra=``
+ends up as a top-level field.
+
+Logging only puts the record on a queue; a background thread formats and
+writes it, so a request never waits on stderr. The thread is started again in
+forked children (gunicorn workers) and drains the queue at exit.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came in through ``extra=``.
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The listener runs in this process: keep exc_info and the extra fields
+        # for JsonFormatter, and only fix the message before the args can change.
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+
+_listener = None
+
+
+def _start_listener(handler, target):
+    """Give ``handler`` a fresh queue and drain it into ``target`` on a daemon thread."""
+    global _listener
+    handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(handler.queue, target)
+    _listener.start()
+
+
+@atexit.register
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()  # writes out what is still queued
+
+
+def configure_logging(level=None):
+    """Route the ``snapfix`` logger hierarchy to stderr as JSON lines."""
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    logger = logging.getLogger('snapfix')
+    logger.setLevel(level)
+    if not any(getattr(handler, '_snapfix', False) for handler in logger.handlers):
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(JsonFormatter())
+        handler = _QueueHandler(None)
+        handler._snapfix = True
+        _start_listener(handler, stream)
+        # A forked child has the queue but not the thread that drains it.
+        os.register_at_fork(after_in_child=lambda: _start_listener(handler, stream))
+        logger.addHandler(handler)
+    logger.propagate = False
+    return logger
@@ -0,0 +1,447 @@
+"""Request metrics, Prometheus exposition and opt-in request profiling.
+
+Everything here is in-process and dependency free: histograms and counters
+live in a small registry guarded by a lock, and ``/metrics`` renders them in
+the Prometheus text format.
+
+Under gunicorn every worker process has its own registry, and a scrape lands
+on whichever worker accepts it. With ``METRICS_DIR`` set (gunicorn.conf.py
+sets it), each worker writes a snapshot of its registry to that folder every
+``METRICS_SYNC_SECONDS`` and when it exits, and ``/metrics`` serves the sum
+of all snapshots. Snapshots of exited workers are folded into one file by
+the master, so counters never go backwards when workers are recycled.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import BASE_DIR
+
+logger = logging.getLogger('snapfix.metrics')
+
+# Seconds. Tuned for a mix of fast DB reads and slow remote calls (Gemini, SMTP).
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    @staticmethod
+    def merge(into, snapshot):
+        for key, value in snapshot:
+            into[tuple(key)] = into.get(tuple(key), 0) + value
+
+    def render(self, others=()):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        values = {}
+        self.merge(values, self.snapshot())
+        for snapshot in others:
+            self.merge(values, snapshot)
+        for key, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, plus running sum and count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), [list(s[0]), s[1], s[2]]] for key, s in self._series.items()]
+
+    @staticmethod
+    def merge(into, snapshot):
+        for key, (counts, total, count) in snapshot:
+            series = into.get(tuple(key))
+            if series is None:
+                into[tuple(key)] = [list(counts), total, count]
+            else:
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+                series[2] += count
+
+    def render(self, others=()):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        series = {}
+        self.merge(series, self.snapshot())
+        for snapshot in others:
+            self.merge(series, snapshot)
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames + ('le',), key + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+    def snapshot(self):
+        """``{metric name: series}`` as plain lists, for ``render`` in another process."""
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def render(self, snapshots=()):
+        """The exposition text of this registry plus ``snapshots`` of other processes."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render([snapshot[metric.name] for snapshot in snapshots
+                                        if metric.name in snapshot]))
+        return '\n'.join(lines) + '\n'
+
+    def combine(self, *snapshots):
+        """One snapshot holding the sums of ``snapshots``."""
+        combined = {}
+        for metric in self._metrics:
+            series = {}
+            for snapshot in snapshots:
+                metric.merge(series, snapshot.get(metric.name, []))
+            combined[metric.name] = [[list(key), value] for key, value in series.items()]
+        return combined
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    'snapfix_http_request_duration_seconds',
+    'HTTP request latency by route.',
+    ('method', 'route', 'status'),
+))
+REQUEST_SQL_QUERIES = registry.register(Histogram(
+    'snapfix_http_request_sql_queries',
+    'Number of SQL statements executed per request.',
+    ('method', 'route'),
+    buckets=COUNT_BUCKETS,
+))
+REQUEST_SQL_TIME = registry.register(Histogram(
+    'snapfix_http_request_sql_duration_seconds',
+    'Total time spent in SQL per request.',
+    ('method', 'route'),
+))
+OPERATION_LATENCY = registry.register(Histogram(
+    'snapfix_operation_duration_seconds',
+    'Latency of hot-path operations (model inference, Gemini, SMTP).',
+    ('operation', 'outcome'),
+))
+SQL_QUERIES_TOTAL = registry.register(Counter(
+    'snapfix_sql_queries_total',
+    'SQL statements executed, including those outside requests.',
+))
+
+
+@contextmanager
+def timed(operation):
+    """Record the duration of a block under ``snapfix_operation_duration_seconds``."""
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        OPERATION_LATENCY.observe(elapsed, operation=operation, outcome=outcome)
+        logger.debug('operation finished', extra={'operation': operation, 'outcome': outcome,
+                                                   'duration_ms': round(elapsed * 1000, 2)})
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('snapfix_query_start', []).append(time.perf_counter())
+
+
+def _query_finished(conn):
+    starts = conn.info.get('snapfix_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    SQL_QUERIES_TOTAL.inc()
+    if has_request_context() and 'sql_queries' in g:
+        g.sql_queries += 1
+        g.sql_time += elapsed
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _query_finished(conn)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # A statement that raised gets no after_cursor_execute; count it here so its
+    # start time doesn't stay on the connection and get paired with a later one.
+    if context.connection is not None and context.execution_context is not None:
+        _query_finished(context.connection)
+
+
+SNAPSHOT_PREFIX = 'metrics-'
+EXITED_SNAPSHOT = 'metrics-exited.json'
+
+
+def _snapshot_path(directory, pid):
+    return os.path.join(directory, f'{SNAPSHOT_PREFIX}{pid}.json')
+
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    # Write and rename, so readers never see half a file.
+    partial = f'{path}.{threading.get_ident()}.tmp'
+    with open(partial, 'w') as f:
+        json.dump(data, f)
+    os.replace(partial, path)
+
+
+def write_snapshot(directory):
+    """Save this process's registry under ``directory`` for the other workers to serve."""
+    _write_json(_snapshot_path(directory, os.getpid()), registry.snapshot())
+
+
+def read_snapshots(directory, exclude_pid=None):
+    """Snapshots saved under ``directory``, except the one of ``exclude_pid``."""
+    own = _snapshot_path(directory, exclude_pid) if exclude_pid is not None else None
+    snapshots = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith('.json')) or path == own:
+            continue
+        try:
+            snapshots.append(_read_json(path))
+        except (OSError, ValueError):
+            continue  # removed by fold_exited meanwhile
+    return snapshots
+
+
+def fold_exited(directory, pid):
+    """Add the last snapshot of exited worker ``pid`` to the exited total, then drop its file.
+
+    Runs in the gunicorn master, one worker at a time.
+    """
+    try:
+        snapshot = _read_json(_snapshot_path(directory, pid))
+    except (OSError, ValueError):
+        return
+    exited_path = os.path.join(directory, EXITED_SNAPSHOT)
+    try:
+        exited = _read_json(exited_path)
+    except (OSError, ValueError):
+        exited = {}
+    _write_json(exited_path, registry.combine(exited, snapshot))
+    os.remove(_snapshot_path(directory, pid))
+
+
+def clear_snapshots(directory):
+    """Forget the snapshots of a previous server run; counters restart with the server."""
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.startswith(SNAPSHOT_PREFIX):
+            os.remove(os.path.join(directory, name))
+
+
+def start_exporter(app):
+    """Save this process's snapshot every ``METRICS_SYNC_SECONDS`` in a daemon thread."""
+    directory, interval = app.config['METRICS_DIR'], app.config['METRICS_SYNC_SECONDS']
+    if not directory or not interval:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                write_snapshot(directory)
+            except Exception:
+                logger.exception('writing metrics snapshot failed')
+
+    thread = threading.Thread(target=loop, name='metrics-exporter', daemon=True)
+    thread.stop = stop
+    thread.start()
+    return thread
+
+
+# cProfile cannot run two profilers at once, so only one request is profiled at a time.
+_profile_lock = threading.Lock()
+
+
+def _route_label():
+    if request.url_rule is not None:
+        return request.url_rule.rule
+    return '<unmatched>'
+
+
+def _start_request():
+    g.request_start = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_time = 0.0
+    g.profiler = None
+
+    if not current_app.config['PROFILING_ENABLED']:
+        return
+    if request.headers.get(current_app.config['PROFILING_HEADER']) != '1':
+        return
+    if not _profile_lock.acquire(blocking=False):
+        logger.info('profiling skipped, another request is being profiled',
+                    extra={'route': _route_label()})
+        return
+    g.profiler = cProfile.Profile()
+    g.profiler.enable()
+
+
+def _finish_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    try:
+        profiler.disable()
+        profile_dir = current_app.config['PROFILING_DIR']
+        os.makedirs(profile_dir, exist_ok=True)
+        filename = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}_{request.endpoint or 'unknown'}.prof"
+        path = os.path.join(profile_dir, filename)
+        profiler.dump_stats(path)
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(15)
+        logger.info('request profiled', extra={'route': _route_label(), 'profile_path': path,
+                                               'profile_summary': summary.getvalue()})
+        response.headers['X-Profile-File'] = filename
+    finally:
+        _profile_lock.release()
+
+
+def init_app(app):
+    """Install request hooks and the ``/metrics`` endpoint on ``app``."""
+    app.config.setdefault('PROFILING_ENABLED', os.getenv('PROFILING_ENABLED', '0') == '1')
+    app.config.setdefault('PROFILING_HEADER', 'X-Profile')
+    # Relative to the backend folder, whatever the working directory.
+    app.config.setdefault('PROFILING_DIR', os.path.join(BASE_DIR, os.getenv('PROFILING_DIR', 'profiles')))
+    # Shared by the worker processes of one server (see the module docstring); unset: per process.
+    app.config.setdefault('METRICS_DIR', os.getenv('METRICS_DIR') or None)
+    app.config.setdefault('METRICS_SYNC_SECONDS', float(os.getenv('METRICS_SYNC_SECONDS') or 5))
+
+    @app.before_request
+    def _metrics_before_request():
+        _start_request()
+
+    @app.after_request
+    def _metrics_after_request(response):
+        if 'request_start' not in g:
+            return response
+        _finish_profile(response)
+
+        elapsed = time.perf_counter() - g.request_start
+        route = _route_label()
+        REQUEST_LATENCY.observe(elapsed, method=request.method, route=route, status=response.status_code)
+        REQUEST_SQL_QUERIES.observe(g.sql_queries, method=request.method, route=route)
+        REQUEST_SQL_TIME.observe(g.sql_time, method=request.method, route=route)
+
+        logger.info('request completed', extra={
+            'method': request.method,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'sql_queries': g.sql_queries,
+            'sql_ms': round(g.sql_time * 1000, 2),
+        })
+        return response
+
+    @app.teardown_request
+    def _metrics_teardown_request(exc):
+        # after_request is skipped on unhandled errors; never leave the profiler running
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        directory = current_app.config['METRICS_DIR']
+        others = read_snapshots(directory, exclude_pid=os.getpid()) if directory else ()
+        return Response(registry.render(others), mimetype='text/plain; version=0.0.4')
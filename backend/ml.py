@@ -0,0 +1,105 @@
+"""Lazily loaded models: the priority classifier pickles and the Gemini client.
+
+Importing scikit-learn, scipy, numpy and ``google.generativeai`` costs far
+more than the rest of the backend, so nothing heavy is imported until a
+route first needs it (or ``warmup`` is called by the production server).
+Pickles are resolved relative to ``MODEL_DIR`` (default: this folder), not
+the working directory.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('snapfix.ml')
+
+MODEL_DIR = os.getenv('MODEL_DIR', os.path.dirname(os.path.abspath(__file__)))
+GEMINI_MODEL = 'models/gemini-2.5-flash'
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def _load(name, loader):
+    try:
+        return _loaded[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _loaded:
+            start = time.perf_counter()
+            _loaded[name] = loader()
+            logger.info('model loaded', extra={'model': name,
+                                               'duration_ms': round((time.perf_counter() - start) * 1000, 2)})
+        return _loaded[name]
+
+
+def _pickle(filename):
+    def loader():
+        import joblib
+        return joblib.load(os.path.join(MODEL_DIR, filename))
+    return loader
+
+
+def preload(name, value):
+    """Install an already-built object under ``name`` (used by benchmarks and tests)."""
+    with _lock:
+        _loaded[name] = value
+
+
+def tfidf_vectorizer():
+    return _load('tfidf_vectorizer', _pickle('tfidf_vectorizer.pkl'))
+
+
+def priority_model():
+    return _load('priority_model', _pickle('priority_model.pkl'))
+
+
+def category_encoder():
+    return _load('category_encoder', _pickle('category_encoder.pkl'))
+
+
+def gemini_model():
+    def loader():
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv('API_KEY'))
+        return genai.GenerativeModel(GEMINI_MODEL)
+    return _load('gemini', loader)
+
+
+def text_vector(description):
+    """TF-IDF row for ``description`` (L2-normalised, so dot products are cosines)."""
+    return tfidf_vectorizer().transform([description])
+
+
+def build_feature_vector(category, description, image_severity, created_at, text_vec=None):
+    import numpy as np
+    from scipy.sparse import hstack, csr_matrix
+
+    # Encode category
+    try:
+        category_encoded = category_encoder().transform([category])[0]
+    except:
+        category_encoded = -1
+
+    # TF-IDF
+    if text_vec is None:
+        text_vec = text_vector(description)
+
+    # Time features
+    hour = created_at.hour
+    is_night = 1 if hour >= 21 or hour <= 6 else 0
+
+    numeric = np.array([[category_encoded, image_severity, hour, is_night]])
+    numeric_sparse = csr_matrix(numeric)
+
+    return hstack([text_vec, numeric_sparse])
+
+
+def warmup():
+    """Load every model and run one prediction so first requests don't pay for it."""
+    from datetime import datetime
+
+    X = build_feature_vector('water', 'warmup', 0.0, datetime.now())
+    priority_model().predict_proba(X)
+    gemini_model()
@@ -0,0 +1,117 @@
+from datetime import datetime
+
+from extensions import db
+
+
+class User(db.Model):
+    __tablename__ = 'users'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    phone = db.Column(db.String(20))
+    password = db.Column(db.String(255), nullable=False)
+    role = db.Column(db.String(20), default='user')  # user, admin, worker
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    workload = db.Column(db.String(255), default='Free')
+    latitude = db.Column(db.String(255))
+    longitude = db.Column(db.String(255))
+    active_tasks = db.Column(db.Integer, default=0, server_default='0')  # complaints in_progress
+    complaints = db.relationship('Complaint', backref='user', lazy=True, foreign_keys='Complaint.user_id')
+
+
+class Complaint(db.Model):
+    __tablename__ = 'complaints'
+    archived = False  # see ArchivedComplaint
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    category = db.Column(db.String(50), nullable=False)  # accident, water, tree, infrastructure, electrical
+    status = db.Column(db.String(20), default='pending')  # pending, assigned, in_progress, completed, rejected, duplicate
+    priority = db.Column(db.String(20), default='low')  # low, medium, high
+    location = db.Column(db.String(255))
+    latitude = db.Column(db.Float)  # parsed from location, for geo filtering
+    longitude = db.Column(db.Float)
+    image_url = db.Column(db.String(255))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    worker_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    parent_id = db.Column(db.Integer, db.ForeignKey('complaints.id'))  # incident this one duplicates
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    worker = db.relationship('User', foreign_keys=[worker_id])
+    updates = db.relationship('ComplaintUpdate', backref='complaint', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_complaints_created_at_id', 'created_at', 'id'),
+        db.Index('ix_complaints_lat_lon', 'latitude', 'longitude'),
+        db.Index('ix_complaints_parent_id', 'parent_id'),
+        db.Index('ix_complaints_updated_at', 'updated_at'),
+        db.Index('ix_complaints_worker_id_status', 'worker_id', 'status'),
+        # Without AUTOINCREMENT SQLite hands out max(id) + 1, so ids of archived
+        # or deleted rows would come back (see archive.py).
+        {'sqlite_autoincrement': True},
+    )
+
+
+class ComplaintUpdate(db.Model):
+    __tablename__ = 'complaint_updates'
+    id = db.Column(db.Integer, primary_key=True)
+    complaint_id = db.Column(db.Integer, db.ForeignKey('complaints.id'), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    updated_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    user = db.relationship('User', foreign_keys=[updated_by])
+
+    __table_args__ = ({'sqlite_autoincrement': True},)
+
+
+class ArchivedComplaint(db.Model):
+    """A closed complaint moved out of ``complaints`` by archive.py; same columns and ids."""
+    __tablename__ = 'complaints_archive'
+    archived = True
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20))
+    priority = db.Column(db.String(20))
+    location = db.Column(db.String(255))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    image_url = db.Column(db.String(255))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    worker_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    parent_id = db.Column(db.Integer)  # may point at a hot or an archived complaint
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user = db.relationship('User', foreign_keys=[user_id])
+    worker = db.relationship('User', foreign_keys=[worker_id])
+    updates = db.relationship('ArchivedComplaintUpdate', lazy=True, cascade='all, delete-orphan',
+                              order_by='ArchivedComplaintUpdate.id')
+
+    __table_args__ = (
+        db.Index('ix_complaints_archive_user_id', 'user_id', 'created_at'),
+        db.Index('ix_complaints_archive_worker_id', 'worker_id', 'created_at'),
+        db.Index('ix_complaints_archive_updated_at', 'updated_at'),
+    )
+
+
+class ArchivedComplaintUpdate(db.Model):
+    __tablename__ = 'complaint_updates_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    complaint_id = db.Column(db.Integer, db.ForeignKey('complaints_archive.id'), nullable=False, index=True)
+    message = db.Column(db.Text, nullable=False)
+    updated_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime)
+
+    user = db.relationship('User', foreign_keys=[updated_by])
+
+
+class ArchiveCount(db.Model):
+    """Archived complaints per (status, category, priority), kept in step by archive.py."""
+    __tablename__ = 'complaint_archive_counts'
+    status = db.Column(db.String(20), primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    priority = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,228 @@
+"""Token-bucket rate limiting for expensive endpoints.
+
+Each limited view names a rule (``@ratelimit.limit('login')``), and
+``RATE_LIMITS`` maps the rule to a rate such as ``'10/minute'``. That allows
+a burst of 10 requests, after which a token comes back every 6 seconds.
+Buckets are keyed by rule and caller: the JWT identity when the view has
+already verified a token, otherwise the client IP. Put the decorator below
+``@jwt_required()`` so the identity is available.
+
+Buckets live in process memory by default. A bucket costs one dict entry
+and one lock acquisition per request, and buckets that have refilled are
+dropped as new ones arrive. With ``RATELIMIT_STORAGE_URL`` pointing at a
+Redis-compatible server (and the ``redis`` package installed), the buckets
+are shared by every worker and host. Each check is then one atomic script
+call. If the server can't be reached, requests are let through rather than
+failing.
+
+Rejected requests get a 429 with ``Retry-After``. Decisions are counted in
+``snapfix_ratelimit_decisions_total``.
+"""
+import functools
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+import metrics
+
+try:
+    import redis
+except ImportError:  # optional: buckets stay in process memory
+    redis = None
+
+logger = logging.getLogger('snapfix.ratelimit')
+
+DECISIONS = metrics.registry.register(metrics.Counter(
+    'snapfix_ratelimit_decisions_total',
+    'Rate limit checks by rule and outcome (allowed, limited, error).',
+    ('rule', 'outcome'),
+))
+
+PERIODS = {'s': 1, 'sec': 1, 'second': 1, 'm': 60, 'min': 60, 'minute': 60,
+           'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+_RATE_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*([a-z]+?)s?\s*$')
+
+# Bucket state in a hash: t = tokens left, u = last update (server time).
+# Runs atomically on the server, so concurrent workers can't both take the last token.
+_REDIS_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 't', 'u')
+local tokens = capacity
+if state[1] then
+    tokens = math.min(capacity, tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * rate)
+end
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'u', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+def parse_rate(value):
+    """``'10/minute'`` or ``'5/30s'`` -> ``(capacity, tokens per second)``; ``None`` when off."""
+    if value is None or str(value).strip().lower() in ('', '0', 'off', 'none'):
+        return None
+    match = _RATE_RE.match(str(value).lower())
+    if not match or match.group(3) not in PERIODS or int(match.group(1)) < 1:
+        raise ValueError(f"Invalid rate limit {value!r}; expected e.g. '10/minute' or '5/30s'")
+    count = int(match.group(1))
+    seconds = int(match.group(2) or 1) * PERIODS[match.group(3)]
+    return count, count / seconds
+
+
+class MemoryStorage:
+    """Buckets for one process, most recently used last."""
+
+    def __init__(self, max_keys=100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets = OrderedDict()  # key -> [tokens, updated, full_at]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def acquire(self, key, capacity, rate):
+        """Take a token. Returns ``(allowed, tokens left, seconds until the next token)``."""
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._evict(now)
+                tokens = capacity
+                bucket = self._buckets[key] = [capacity, now, now]
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                self._buckets.move_to_end(key)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            bucket[0], bucket[1] = tokens, now
+            bucket[2] = now + (capacity - tokens) / rate
+        return allowed, tokens, 0.0 if allowed else (1 - tokens) / rate
+
+    def _evict(self, now):
+        # A refilled bucket behaves like a missing one, so it can go. Checking a
+        # couple of the least recently used per new key keeps this O(1).
+        buckets = self._buckets
+        for _ in range(2):
+            if not buckets or next(iter(buckets.values()))[2] > now:
+                break
+            buckets.popitem(last=False)
+        while len(buckets) >= self.max_keys:
+            buckets.popitem(last=False)
+
+
+class RedisStorage:
+    """Buckets shared through a Redis-compatible server."""
+
+    def __init__(self, url, prefix='snapfix:ratelimit:'):
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self._client.register_script(_REDIS_SCRIPT)
+
+    def acquire(self, key, capacity, rate):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[capacity, repr(rate)])
+        tokens = float(tokens)
+        return bool(allowed), tokens, 0.0 if allowed else (1 - tokens) / rate
+
+
+def _client_ip(proxy_count):
+    if proxy_count:
+        # Trust only the entries appended by our own proxies, counting from the right.
+        forwarded = request.headers.get('X-Forwarded-For', '').split(',')
+        if len(forwarded) >= proxy_count and forwarded[-proxy_count].strip():
+            return forwarded[-proxy_count].strip()
+    return request.remote_addr or 'unknown'
+
+
+def _caller(proxy_count):
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:  # no verified token on this request
+        identity = None
+    if identity is not None:
+        return f'user:{identity}'
+    return f'ip:{_client_ip(proxy_count)}'
+
+
+class RateLimiter:
+    def __init__(self, rules, storage, proxy_count=0):
+        self.rules = rules
+        self.storage = storage
+        self.proxy_count = proxy_count
+
+    def check(self, rule):
+        """``None`` if the request may go ahead, otherwise the 429 response."""
+        limit = self.rules.get(rule)
+        if limit is None:
+            return None
+        capacity, rate = limit
+        key = f'{rule}:{_caller(self.proxy_count)}'
+        try:
+            allowed, _, retry_after = self.storage.acquire(key, capacity, rate)
+        except Exception:
+            DECISIONS.inc(rule=rule, outcome='error')
+            logger.warning('rate limit storage unavailable, allowing request',
+                           extra={'rule': rule}, exc_info=True)
+            return None
+        if allowed:
+            DECISIONS.inc(rule=rule, outcome='allowed')
+            return None
+
+        DECISIONS.inc(rule=rule, outcome='limited')
+        logger.info('rate limited', extra={'rule': rule, 'key': key})
+        response = jsonify({'message': 'Too many requests, please try again later'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+
+def limit(rule):
+    """Apply the ``RATE_LIMITS[rule]`` bucket to a view."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            limiter = current_app.extensions.get('ratelimit')
+            if limiter is not None:
+                rejected = limiter.check(rule)
+                if rejected is not None:
+                    return rejected
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def make_storage(config):
+    url = config['RATELIMIT_STORAGE_URL'] or 'memory://'
+    if url.startswith('memory://'):
+        return MemoryStorage(config['RATELIMIT_MAX_KEYS'])
+    if redis is None:
+        logger.warning('redis is not installed; rate limit buckets are kept per process')
+        return MemoryStorage(config['RATELIMIT_MAX_KEYS'])
+    return RedisStorage(url)
+
+
+def init_app(app):
+    if not app.config['RATELIMIT_ENABLED']:
+        return
+    rules = {}
+    for rule, value in app.config['RATE_LIMITS'].items():
+        parsed = parse_rate(value)
+        if parsed is not None:
+            rules[rule] = parsed
+    app.extensions['ratelimit'] = RateLimiter(rules, make_storage(app.config),
+                                              app.config['RATELIMIT_PROXY_COUNT'])
@@ -0,0 +1,157 @@
+"""JSON encoding and response compression for every route.
+
+``jsonify`` goes through ``app.json``, so swapping the provider changes the
+encoder for all routes at once:
+
+- With ``orjson`` installed (and ``FAST_JSON`` on), payloads are encoded by
+  orjson straight to bytes. It encodes ``datetime`` natively, so serializers
+  (see serializers.py) hand datetimes over as-is instead of calling
+  ``isoformat()`` on each field.
+- Without it, the stdlib encoder is used, with the same ISO 8601 output for
+  dates.
+
+Responses at or above ``COMPRESS_MIN_SIZE`` bytes are compressed with
+brotli (when the ``brotli`` package is installed) or gzip, whichever the
+client's ``Accept-Encoding`` prefers. Streamed and already-encoded responses
+are left alone.
+"""
+import dataclasses
+import decimal
+import gzip
+import json
+import logging
+import uuid
+from datetime import date, datetime
+
+from flask import request
+from flask.json.provider import JSONProvider
+
+import metrics
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+logger = logging.getLogger('snapfix.responses')
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+
+def _default(o):
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    # numpy scalars from the models (e.g. predict_proba output).
+    if hasattr(o, 'item'):
+        return o.item()
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class StdlibJSONProvider(JSONProvider):
+    """Stdlib ``json`` with ISO 8601 dates (Flask's default uses HTTP dates)."""
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', False)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self.dumps(obj, separators=(',', ':'))
+        return self._app.response_class(body.encode('utf-8'), mimetype='application/json')
+
+
+class OrjsonProvider(JSONProvider):
+    """orjson-backed provider; ``response`` skips the bytes -> str -> bytes round trip."""
+
+    OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self.OPTIONS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=_default, option=self.OPTIONS),
+                                        mimetype='application/json')
+
+
+def _accepted_encodings(header):
+    """``{coding: q}`` from an Accept-Encoding header."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header):
+    """Pick ``'br'``, ``'gzip'`` or ``None`` for an Accept-Encoding header."""
+    accepted = _accepted_encodings(header or '')
+    wildcard = accepted.get('*', 0.0)
+    options = [('br', accepted.get('br', wildcard))] if brotli else []
+    options.append(('gzip', accepted.get('gzip', wildcard)))
+    coding, q = max(options, key=lambda option: option[1])  # ties keep br first
+    return coding if q > 0 else None
+
+
+def compress_response(response, config):
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or not response.mimetype.startswith(COMPRESSIBLE_TYPES)):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < config['COMPRESS_MIN_SIZE']:
+        return response
+    coding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if coding is None:
+        return response
+
+    with metrics.timed(f'compress_{coding}'):
+        if coding == 'br':
+            compressed = brotli.compress(body, quality=config['COMPRESS_BROTLI_QUALITY'])
+        else:
+            compressed = gzip.compress(body, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = coding
+    return response
+
+
+def init_app(app):
+    if app.config['FAST_JSON'] and orjson is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        if app.config['FAST_JSON']:
+            logger.warning('orjson is not installed; using the stdlib JSON encoder')
+        app.json = StdlibJSONProvider(app)
+
+    if app.config['COMPRESS_ENABLED']:
+        @app.after_request
+        def compress(response):
+            return compress_response(response, app.config)
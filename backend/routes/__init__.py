@@ -0,0 +1 @@
+"""HTTP routes, grouped into blueprints registered by ``create_app``."""
@@ -0,0 +1,230 @@
+import logging
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt
+
+import archive
+import export
+import geo
+import metrics
+from extensions import db
+from models import ArchivedComplaint, User, Complaint
+from scoring import parse_bbox
+from serializers import complaint_brief, user_summary, worker_contact, worker_summary
+
+logger = logging.getLogger('snapfix.admin')
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/api/worker/<int:worker_id>', methods=["GET"])
+@jwt_required()
+def get_worker_mail(worker_id):
+    try:
+        claims = get_jwt()
+
+        if claims.get('role') != 'admin':
+            return jsonify({'message': 'Unauthorized'}), 403
+        
+        worker = User.query.filter_by(role='worker', id=worker_id).first()
+
+        if not worker:
+            return jsonify({'message': 'Worker not found'}), 404
+
+        return jsonify(worker_contact(worker)), 200
+    
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+
+@admin_bp.route('/api/workers', methods=['GET'])
+@jwt_required()
+def get_workers():
+    try:
+        claims = get_jwt()
+        
+        if claims.get('role') != 'admin':
+            return jsonify({'message': 'Unauthorized'}), 403
+        
+        page = request.args.get('page', 1, type=int)
+        limit = request.args.get('limit', 5, type=int)
+
+        query = User.query.filter_by(role='worker')
+
+        pagination = query.order_by(User.workload.desc()).paginate(
+            page=page,
+            per_page=limit,
+            error_out=False
+        )
+
+        workers = pagination.items
+        
+        # One grouped count per table for the whole page.
+        assigned = {worker.id: 0 for worker in workers}
+        if assigned:
+            for model in (Complaint, ArchivedComplaint):
+                for worker_id, count in (db.session.query(model.worker_id, db.func.count(model.id))
+                                         .filter(model.worker_id.in_(assigned))
+                                         .group_by(model.worker_id)):
+                    assigned[worker_id] += count
+        result = [worker_summary(worker, assigned[worker.id]) for worker in workers]
+        
+        return jsonify({
+            'data': result,
+            'page': page,
+            'limit': limit,
+            'total_items': pagination.total,
+            'total_pages': pagination.pages
+        }), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@admin_bp.route('/api/analytics', methods=['GET'])
+@jwt_required()
+def get_analytics():
+    try:
+        claims = get_jwt()
+        
+        if claims.get('role') != 'admin':
+            return jsonify({'message': 'Unauthorized'}), 403
+        
+        # Hot counts in one pass per dimension, plus the archive's running totals.
+        def breakdown(column, dimension):
+            counts = archive.counts(dimension)
+            for value, count in db.session.query(column, db.func.count(Complaint.id)).group_by(column):
+                counts[value] = counts.get(value, 0) + count
+            return counts
+
+        status_data = breakdown(Complaint.status, 'status')
+        category_data = breakdown(Complaint.category, 'category')
+        priority_data = breakdown(Complaint.priority, 'priority')
+
+        total_complaints = sum(status_data.values())
+        total_users = User.query.filter_by(role='user').count()
+        total_workers = User.query.filter_by(role='worker').count()
+        
+        # Recent complaints
+        recent_complaints = Complaint.query.order_by(
+            Complaint.created_at.desc()
+        ).limit(5).all()
+        
+        recent_list = [complaint_brief(complaint) for complaint in recent_complaints]
+        
+        return jsonify({
+            'total_complaints': total_complaints,
+            'total_users': total_users,
+            'total_workers': total_workers,
+            'status_breakdown': {
+                status: status_data.get(status, 0)
+                for status in ('pending', 'assigned', 'in_progress', 'completed', 'rejected')
+            },
+            'category_breakdown': category_data,
+            'priority_breakdown': priority_data,
+            'recent_complaints': recent_list
+        }), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@admin_bp.route('/api/analytics/geo', methods=['GET'])
+@jwt_required()
+def get_geo_analytics():
+    try:
+        claims = get_jwt()
+
+        if claims.get('role') != 'admin':
+            return jsonify({'message': 'Unauthorized'}), 403
+
+        zoom = request.args.get('zoom', 12, type=int)
+        if not 0 <= zoom <= geo.MAX_ZOOM:
+            return jsonify({'message': f"'zoom' must be between 0 and {geo.MAX_ZOOM}"}), 400
+        bbox = None
+        if request.args.get('bbox'):
+            try:
+                bbox = parse_bbox(request.args['bbox'])
+            except ValueError as e:
+                return jsonify({'message': str(e)}), 400
+
+        index = geo.get_index(current_app.config)
+        with metrics.timed('geo_sync'):
+            index.sync()
+        tiles = index.heatmap(zoom, bbox)
+
+        return jsonify({
+            'zoom': zoom,
+            'tiles': tiles,
+            'total': sum(tile['count'] for tile in tiles)
+        }), 200
+    except Exception as e:
+        logger.exception('geo analytics failed')
+        return jsonify({'message': str(e)}), 500
+
+@admin_bp.route('/api/export/complaints', methods=['GET'])
+@jwt_required()
+def export_complaints():
+    try:
+        claims = get_jwt()
+
+        if claims.get('role') != 'admin':
+            return jsonify({'message': 'Unauthorized'}), 403
+
+        fmt = request.args.get('format', 'ndjson')
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        statuses = [s.strip() for s in request.args.get('status', '').split(',') if s.strip()]
+        dates = {}
+        for name in ('from', 'to'):
+            if request.args.get(name):
+                try:
+                    dates[name] = datetime.fromisoformat(request.args[name])
+                except ValueError:
+                    return jsonify({'message': f"'{name}' must be an ISO date or datetime"}), 400
+        since = export.parse_since(request.args['since']) if request.args.get('since') else None
+
+        chunks = export.stream_complaints(fmt, compress=compress, statuses=statuses,
+                                          date_from=dates.get('from'), date_to=dates.get('to'), since=since)
+        headers = {
+            'Content-Disposition': f'attachment; filename=complaints.{fmt}',
+            # Let proxies pass chunks through instead of buffering the whole export.
+            'X-Accel-Buffering': 'no',
+        }
+        if compress:
+            headers['Content-Encoding'] = 'gzip'
+        return Response(stream_with_context(chunks), content_type=export.FORMATS[fmt], headers=headers)
+    except export.ExportError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        logger.exception('export failed')
+        return jsonify({'message': str(e)}), 500
+
+@admin_bp.route('/api/users', methods=['GET'])
+@jwt_required()
+def get_users():
+    try:
+        claims = get_jwt()
+        
+        if claims.get('role') != 'admin':
+            return jsonify({'message': 'Unauthorized'}), 403
+        
+        page = request.args.get('page', 1, type=int)
+        limit = request.args.get('limit', 5, type=int)
+
+        query = User.query.filter(User.role.in_(['user', 'worker']))
+        
+        pagination = query.order_by(User.workload.desc()).paginate(
+            page=page,
+            per_page=limit,
+            error_out=False
+        )
+
+        users = pagination.items
+
+        result = [user_summary(user) for user in users]
+        
+        return jsonify({
+            'data': result,
+            'page': page,
+            'limit': limit,
+            'total_items': pagination.total,
+            'total_pages': pagination.pages
+        }), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
@@ -0,0 +1,78 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import create_access_token
+
+import ratelimit
+from extensions import bcrypt, db, jwt
+from models import User
+
+auth_bp = Blueprint('auth', __name__)
+
+# JWT configuration for additional claims
+@jwt.additional_claims_loader
+def add_claims_to_access_token(identity):
+    user = User.query.get(identity)
+    if user:
+        return {
+            'role': user.role,
+            'email': user.email,
+            'name': user.name
+        }
+    return {}
+
+# Routes
+
+@auth_bp.route('/api/register', methods=['POST'])
+def register():
+    try:
+        data = request.json
+        
+        # Check if user exists
+        if User.query.filter_by(email=data['email']).first():
+            return jsonify({'message': 'Email already registered'}), 400
+        
+        # Hash password
+        hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+        
+        # Create new user
+        new_user = User(
+            name=data['name'],
+            email=data['email'],
+            phone=data.get('phone', ''),
+            password=hashed_password,
+            role=data.get('role', 'user'),
+            latitude=data['latitude'],
+            longitude=data['longitude']
+        )
+        
+        db.session.add(new_user)
+        db.session.commit()
+        
+        return jsonify({'message': 'User registered successfully'}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
+@auth_bp.route('/api/login', methods=['POST'])
+@ratelimit.limit('login')
+def login():
+    try:
+        data = request.json
+        user = User.query.filter_by(email=data['email']).first()
+        
+        if user and bcrypt.check_password_hash(user.password, data['password']):
+            # Use user ID as identity (as string for JWT compatibility), additional claims added automatically
+            access_token = create_access_token(identity=str(user.id))
+            
+            return jsonify({
+                'access_token': access_token,
+                'user': {
+                    'id': user.id,
+                    'name': user.name,
+                    'email': user.email,
+                    'role': user.role
+                }
+            }), 200
+        
+        return jsonify({'message': 'Invalid credentials'}), 401
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
@@ -0,0 +1,534 @@
+import logging
+import math
+import os
+from datetime import datetime
+
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import case, update as sql_update
+from sqlalchemy.orm import joinedload
+from werkzeug.utils import secure_filename
+
+import archive
+import dedup
+import geo
+import metrics
+import ml
+import ratelimit
+import routing
+import search
+import workload
+from extensions import db
+from models import ArchivedComplaint, User, Complaint, ComplaintUpdate
+from scoring import compute_score, parse_bbox, parse_location
+from serializers import complaint_detail, complaint_summary
+
+logger = logging.getLogger('snapfix.complaints')
+
+complaints_bp = Blueprint('complaints', __name__)
+
+@complaints_bp.route('/api/allcomplaints', methods=['GET'])
+@jwt_required()
+def get_allcomplaints():
+    try:
+        user_id = get_jwt_identity()
+        claims = get_jwt()
+
+        owner = 'worker_id' if claims.get('role') == 'worker' else 'user_id'
+        # A person's history includes what has been archived since.
+        complaints = sorted(
+            [*Complaint.query.filter_by(**{owner: user_id}), *ArchivedComplaint.query.filter_by(**{owner: user_id})],
+            key=lambda complaint: complaint.created_at or datetime.min,
+            reverse=True
+        )
+
+        result = [complaint_summary(complaint) for complaint in complaints]
+
+        # Response with pagination metadata
+        return jsonify({
+            'data': result,
+        }), 200
+
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+def _priority_order(model):
+    return case(
+        (model.priority == "Critical", 1),
+        (model.priority == "High", 2),
+        (model.priority == "Medium", 3),
+        (model.priority == "Low", 4),
+        else_=5
+    )
+
+
+def _status_order(model):
+    return case(
+        (model.status == "pending", 1),
+        (model.status == "assigned", 2),
+        (model.status == "completed", 3),
+        else_=4
+    )
+
+
+@complaints_bp.route('/api/complaints', methods=['GET'])
+@jwt_required()
+def get_complaints():
+    try:
+        user_id = get_jwt_identity()
+        claims = get_jwt()
+
+        # Pagination parameters
+        page = max(request.args.get('page', 1, type=int), 1)
+        limit = max(request.args.get('limit', 5, type=int), 1)
+
+        # Choose query based on role
+        if claims.get('role') == 'admin':
+            def order(model):
+                return [
+                    (_status_order(model), False),    # pending → assigned → completed
+                    (_priority_order(model), False),  # Critical → Low
+                    (model.created_at, True),
+                ]
+
+            def where(model):
+                return []
+
+            # The dispatch queue is live work; old closed complaints only on request.
+            include_archived = request.args.get('include_archived', '').lower() in ('1', 'true')
+        else:
+            owner = 'worker_id' if claims.get('role') == 'worker' else 'user_id'
+
+            def order(model):
+                return [(model.created_at, True)]
+
+            def where(model):
+                return [getattr(model, owner) == user_id]
+
+            include_archived = True
+
+        # Apply pagination
+        if include_archived:
+            complaints, total = archive.paginate(where, order, page, limit)
+        else:
+            pagination = (Complaint.query
+                          .filter(*where(Complaint))
+                          .order_by(*(key.desc() if descending else key for key, descending in order(Complaint)))
+                          .paginate(page=page, per_page=limit, error_out=False))
+            complaints, total = pagination.items, pagination.total
+
+        result = []
+        for complaint in complaints:
+            best_worker = None
+            best_score = float('inf')
+            if claims.get('role') == 'admin':
+                workers = User.query.filter_by(role='worker')
+
+                for worker in workers:
+                    score = compute_score(worker, complaint)
+                    if score < best_score:
+                        best_score = score
+                        best_worker = worker
+                
+                data = complaint_summary(complaint)
+                data.update({
+                    'worker': best_worker.name if best_worker else None,
+                    'worker_id': best_worker.id if best_worker else None,
+                    'score': round(best_score, 2) if best_score else None
+                })
+                result.append(data)
+            else:
+                result.append(complaint_summary(complaint))
+
+        # Response with pagination metadata
+        return jsonify({
+            'data': result,
+            'page': page,
+            'limit': limit,
+            'total_items': total,
+            'total_pages': math.ceil(total / limit)
+        }), 200
+
+    except Exception as e:
+        logger.exception('listing complaints failed')
+        return jsonify({'error': str(e)}), 500
+
+@complaints_bp.route('/api/complaints', methods=['POST'])
+@jwt_required()
+@ratelimit.limit('create_complaint')
+def create_complaint():
+    try:
+        user_id = get_jwt_identity()
+        claims = get_jwt()
+        logger.info('creating complaint', extra={'user_id': user_id, 'user_name': claims.get('name')})
+        
+        # Handle file upload
+        image_url = None
+        if 'image' in request.files:
+            file = request.files['image']
+            if file and file.filename:
+                filename = secure_filename(f"{datetime.now().timestamp()}_{file.filename}")
+                filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+                file.save(filepath)
+                image_url = f"/uploads/{filename}"
+                logger.debug('image saved', extra={'path': filepath})
+        
+        # Get form data
+        title = request.form.get('title')
+        description = request.form.get('description')
+        category = request.form.get('category')
+        location = request.form.get('location', '')
+        image_severity_score = request.form.get('image_severity_score')
+        
+        if not title or not description or not category:
+            return jsonify({'message': 'Title, description, and category are required'}), 400
+
+        created_at = datetime.now()
+
+        with metrics.timed('priority_model'):
+            text_vec = ml.text_vector(description)
+            X_priority = ml.build_feature_vector(
+                category=category,
+                description=description,
+                image_severity=float(image_severity_score or 0),
+                created_at=created_at,
+                text_vec=text_vec
+            )
+
+            priority_model = ml.priority_model()
+            priority = priority_model.predict(X_priority)[0]
+            confidence = max(priority_model.predict_proba(X_priority)[0])
+
+        logger.debug('priority predicted', extra={
+            'category': category,
+            'image_severity_score': image_severity_score,
+            'priority': priority,
+            'confidence': float(confidence),
+        })
+
+        if priority == "P1":
+            priority = "Critical"
+        elif priority == "P2":
+            priority = "High"
+        elif priority == "P3":
+            priority = "Medium"
+        elif priority == "P4":
+            priority = "Low"
+
+        latitude, longitude = parse_location(location)
+
+        # Fold reports of an incident that is already open into it, so it is dispatched once.
+        match = None
+        if current_app.config['DEDUP_ENABLED']:
+            with metrics.timed('dedup'):
+                match = dedup.find_parent(current_app.config, category, latitude, longitude, text_vec)
+
+        new_complaint = Complaint(
+            title=title,
+            description=description,
+            category=category,
+            location=location,
+            latitude=latitude,
+            longitude=longitude,
+            image_url=image_url,
+            user_id=user_id,
+            priority=priority
+        )
+        if match:
+            parent, similarity, distance = match
+            new_complaint.parent_id = parent.id
+            new_complaint.status = dedup.DUPLICATE
+        
+        db.session.add(new_complaint)
+        db.session.flush()
+        search.index_complaint(new_complaint)
+        db.session.commit()
+        if current_app.config['DEDUP_ENABLED']:
+            dedup.remember(current_app.config, new_complaint, text_vec)
+
+        if match:
+            logger.info('complaint linked to open incident', extra={
+                'complaint_id': new_complaint.id,
+                'parent_id': parent.id,
+                'similarity': round(similarity, 3),
+                'distance_km': round(distance, 3),
+            })
+            return jsonify({
+                'message': 'This issue has already been reported; your complaint was linked to it',
+                'id': new_complaint.id,
+                'duplicate_of': parent.id
+            }), 201
+
+        logger.info('complaint created', extra={'complaint_id': new_complaint.id, 'priority': priority})
+        return jsonify({'message': 'Complaint submitted successfully', 'id': new_complaint.id}), 201
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('creating complaint failed')
+        return jsonify({'message': str(e)}), 500
+
+def _split_arg(name):
+    value = request.args.get(name)
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise search.SearchError(f"'{name}' must be an ISO date or datetime")
+
+
+def _bbox_arg():
+    value = request.args.get('bbox')
+    if not value:
+        return None
+    try:
+        return parse_bbox(value)
+    except ValueError as e:
+        raise search.SearchError(str(e))
+
+
+def _route_start(worker, tasks):
+    """``((lat, lon), source)`` to route from: the request, the worker's profile, or the most urgent task."""
+    lat, lon = request.args.get('lat', type=float), request.args.get('lon', type=float)
+    if lat is not None and lon is not None:
+        start = parse_location(f'{lat}, {lon}')
+        if start[0] is None:
+            raise ValueError("'lat' and 'lon' must be valid coordinates")
+        return start, 'request'
+    start = parse_location(f'{worker.latitude}, {worker.longitude}')
+    if start[0] is not None:
+        return start, 'profile'
+    first = min(tasks, key=lambda task: (-routing.priority_weight(task.priority), task.created_at or datetime.min))
+    return (first.latitude, first.longitude), 'task'
+
+
+@complaints_bp.route('/api/worker/route', methods=['GET'])
+@jwt_required()
+def get_worker_route():
+    try:
+        claims = get_jwt()
+        if claims.get('role') == 'worker':
+            worker_id = int(get_jwt_identity())
+        elif claims.get('role') == 'admin':
+            worker_id = request.args.get('worker_id', type=int)
+            if worker_id is None:
+                return jsonify({'message': "'worker_id' is required"}), 400
+        else:
+            return jsonify({'message': 'Unauthorized'}), 403
+        worker = User.query.filter_by(role='worker', id=worker_id).first()
+        if worker is None:
+            return jsonify({'message': 'Worker not found'}), 404
+
+        open_tasks = (Complaint.query
+                      .filter(Complaint.worker_id == worker_id, Complaint.status.in_(routing.OPEN_STATUSES))
+                      .order_by(Complaint.created_at, Complaint.id)
+                      .all())
+        located = [task for task in open_tasks if task.latitude is not None and task.longitude is not None]
+        unlocated = [task for task in open_tasks if task.latitude is None or task.longitude is None]
+
+        start, source, stops, legs, cached = None, None, [], [], False
+        if located:
+            start, source = _route_start(worker, located)
+            with metrics.timed('route'):
+                stops, legs, cached = routing.plan(routing.get_cache(current_app.config), worker_id, start, located)
+
+        result, travelled = [], 0.0
+        for position, (task, leg) in enumerate(zip(stops, legs), start=1):
+            travelled += leg
+            result.append({**complaint_summary(task), 'stop': position,
+                           'leg_km': round(leg, 3), 'distance_km': round(travelled, 3)})
+
+        return jsonify({
+            'data': result,
+            'unlocated': [complaint_summary(task) for task in unlocated],
+            'start': start and {'latitude': start[0], 'longitude': start[1], 'source': source},
+            'total_km': round(travelled, 3),
+            'cached': cached
+        }), 200
+
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        logger.exception('planning worker route failed')
+        return jsonify({'message': str(e)}), 500
+
+
+@complaints_bp.route('/api/complaints/search', methods=['GET'])
+@jwt_required()
+def search_complaints():
+    try:
+        user_id = get_jwt_identity()
+        claims = get_jwt()
+
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+
+        query = Complaint.query.options(joinedload(Complaint.user), joinedload(Complaint.worker))
+        if claims.get('role') == 'worker':
+            query = query.filter_by(worker_id=user_id)
+        elif claims.get('role') != 'admin':
+            query = query.filter_by(user_id=user_id)
+
+        complaints, next_cursor = search.search_complaints(
+            query,
+            q=request.args.get('q', '').strip() or None,
+            statuses=_split_arg('status'),
+            categories=_split_arg('category'),
+            priorities=_split_arg('priority'),
+            date_from=_date_arg('from'),
+            date_to=_date_arg('to'),
+            bbox=_bbox_arg(),
+            cursor=request.args.get('cursor'),
+            limit=limit,
+        )
+
+        result = [complaint_summary(complaint) for complaint in complaints]
+
+        return jsonify({
+            'data': result,
+            'limit': limit,
+            'next_cursor': next_cursor
+        }), 200
+
+    except search.SearchError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        logger.exception('searching complaints failed')
+        return jsonify({'message': str(e)}), 500
+
+
+@complaints_bp.route('/api/complaints/<int:complaint_id>', methods=['GET'])
+@jwt_required()
+def get_complaint(complaint_id):
+    try:
+        complaint = db.session.get(Complaint, complaint_id) or archive.get(complaint_id)
+        if complaint is None:
+            return jsonify({'message': 'Complaint not found'}), 404
+        return jsonify(complaint_detail(complaint)), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@complaints_bp.route('/api/complaints/<int:complaint_id>', methods=['PUT'])
+@jwt_required()
+def update_complaint(complaint_id):
+    try:
+        user_id = get_jwt_identity()
+        claims = get_jwt()
+        data = request.json
+        
+        # Only admin and assigned worker can update
+        if claims.get('role') not in ['admin', 'worker']:
+            return jsonify({'message': 'Unauthorized'}), 403
+
+        # Reopening or annotating an archived complaint brings it back to the hot table.
+        complaint = db.session.get(Complaint, complaint_id) or archive.restore(complaint_id)
+        if complaint is None:
+            return jsonify({'message': 'Complaint not found'}), 404
+        
+        old_status, old_worker_id = complaint.status, complaint.worker_id
+        changes = {'updated_at': datetime.utcnow()}
+
+        if 'status' in data:
+            changes['status'] = data['status']
+        if 'priority' in data and claims.get('role') == 'admin':
+            changes['priority'] = data['priority']
+        if 'worker_id' in data and claims.get('role') == 'admin':
+            changes['worker_id'] = data['worker_id']
+            changes['status'] = 'assigned'
+
+        # Compare-and-set on (status, worker_id): if another request changed the
+        # complaint since we read it, our view of the workload delta is stale.
+        result = db.session.execute(
+            sql_update(Complaint)
+            .where(Complaint.id == complaint_id,
+                   Complaint.status == old_status,
+                   Complaint.worker_id == old_worker_id)
+            .values(**changes)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.session.rollback()
+            return jsonify({'message': 'Complaint was modified concurrently, please retry'}), 409
+
+        workload.apply_status_change(
+            old_worker_id, old_status,
+            changes.get('worker_id', old_worker_id), changes.get('status', old_status)
+        )
+
+        # Closing an incident closes the reports that were folded into it.
+        closed = changes.get('status') in dedup.CLOSED_STATUSES
+        if closed:
+            Complaint.query.filter_by(parent_id=complaint_id, status=dedup.DUPLICATE).update(
+                {'status': changes['status'], 'updated_at': changes['updated_at']},
+                synchronize_session=False)
+
+        # Add update log
+        if 'message' in data:
+            complaint_update = ComplaintUpdate(
+                complaint_id=complaint_id,
+                message=data['message'],
+                updated_by=user_id
+            )
+            db.session.add(complaint_update)
+        
+        db.session.commit()
+        if closed:
+            dedup.get_index(current_app.config).discard(complaint_id)
+        
+        return jsonify({'message': 'Complaint updated successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
+@complaints_bp.route('/api/complaints/<int:complaint_id>', methods=['DELETE'])
+@jwt_required()
+def delete_complaint(complaint_id):
+    try:
+        claims = get_jwt()
+        
+        if claims.get('role') != 'admin':
+            return jsonify({'message': 'Unauthorized'}), 403
+        
+        complaint = db.session.get(Complaint, complaint_id)
+        if complaint is None:
+            archived = archive.get(complaint_id)
+            if archived is None:
+                return jsonify({'message': 'Complaint not found'}), 404
+            archive.delete_archived(archived)
+            db.session.commit()
+            geo.get_index(current_app.config).forget(complaint_id)
+            return jsonify({'message': 'Complaint deleted successfully'}), 200
+
+        # Reports folded into this one become standalone complaints again.
+        Complaint.query.filter_by(parent_id=complaint_id).update(
+            {'parent_id': None, 'updated_at': datetime.utcnow(),
+             'status': case((Complaint.status == dedup.DUPLICATE, 'pending'), else_=Complaint.status)},
+            synchronize_session=False)
+        archive.detach_children(complaint_id)
+        # Same compare-and-set as update_complaint, so the counter we reverse is
+        # the one this complaint's (worker, status) actually added.
+        result = db.session.execute(
+            sql_update(Complaint)
+            .where(Complaint.id == complaint_id,
+                   Complaint.status == complaint.status,
+                   Complaint.worker_id == complaint.worker_id)
+            .values(updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.session.rollback()
+            return jsonify({'message': 'Complaint was modified concurrently, please retry'}), 409
+        workload.apply_status_change(complaint.worker_id, complaint.status, None, None)
+        search.remove_complaint(complaint.id)
+        db.session.delete(complaint)
+        db.session.commit()
+        dedup.get_index(current_app.config).discard(complaint_id)
+        geo.get_index(current_app.config).forget(complaint_id)
+        
+        return jsonify({'message': 'Complaint deleted successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
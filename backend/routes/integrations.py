@@ -0,0 +1,101 @@
+import json
+import logging
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from flask_mail import Message
+
+import metrics
+import ml
+import ratelimit
+from extensions import mail
+
+logger = logging.getLogger('snapfix.integrations')
+
+integrations_bp = Blueprint('integrations', __name__)
+
+@integrations_bp.route('/api/autofill', methods=['POST'])
+@jwt_required()
+@ratelimit.limit('autofill')
+def autofill():
+    try:
+        if 'image' not in request.files:
+            return jsonify({'error': 'No image uploaded'}), 400
+
+        image = request.files['image']
+        img_bytes = image.read()
+        mime = image.content_type
+
+        prompt = """
+        Respond ONLY with a valid JSON object.
+
+        Extract from the image:
+          - Title (5–8 words)
+          - Description (1–2 or more sentences depending on the severity of the incident)
+          - Image Severity Score (0-1, where accidents and infrastructure damage will get a high score while other incidents will receive low score) 
+          - Category:
+            1. Road Accident (return as 'accident')
+            2. Water Leakage (return as 'water')
+            3. Tree/Pole Damage (return as 'tree')
+            4. Electrical Issues (return as 'electrical')
+            5. Infrastructure Damage (return as 'infrastructure')
+
+            If the image falls under that category, return the word given in the corresponding parenthesis 
+  ];
+
+        Return exactly:
+        {
+          "title": "",
+          "description": "",
+          "category": "",
+          "image_severity_score": 0.00
+        }
+        """
+
+        with metrics.timed('gemini'):
+            response = ml.gemini_model().generate_content([
+                prompt,
+                {"mime_type": mime, "data": img_bytes}
+            ])
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('gemini raw response', extra={'response': str(response)})
+
+        # Sometimes Gemini returns list of candidates
+        try:
+            text_output = response.text
+        except:
+            text_output = response.candidates[0].content.parts[0].text
+
+        logger.debug('gemini text output', extra={'text_output': text_output})
+
+        if text_output.startswith("```json"):
+            text_output = text_output.replace("```json", "").replace("```", "").strip()
+        output = json.loads(text_output)
+        return jsonify(output)
+
+    except Exception as e:
+        logger.exception('autofill failed')
+        return jsonify({"error": str(e)}), 500
+
+@integrations_bp.route('/send-mail', methods=['POST'])
+@jwt_required()
+@ratelimit.limit('send_mail')
+def send_mail():
+    email = request.form.get('email')
+    subject = request.form.get('subject')
+    body = request.form.get('body')
+
+    try:
+        msg = Message(
+            subject=subject,
+            recipients=[email],   # List of recipients
+            html=body
+        )
+        with metrics.timed('smtp'):
+            mail.send(msg)
+        return jsonify({"message": "Email sent successfully"})
+    
+    except Exception as e:
+        logger.exception('sending mail failed')
+        return jsonify({"error": str(e)}), 500
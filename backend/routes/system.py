@@ -0,0 +1,12 @@
+from flask import Blueprint, current_app, jsonify, send_from_directory
+
+system_bp = Blueprint('system', __name__)
+
+# Serve uploaded files
+@system_bp.route('/uploads/<filename>')
+def uploaded_file(filename):
+    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+
+@system_bp.route('/api/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'healthy'}), 200
@@ -0,0 +1,212 @@
+"""Visiting order for a worker's open tasks.
+
+A worker with a dozen assigned complaints should not criss-cross the city in
+the order they were filed. ``solve`` orders the stops to minimise the
+priority-weighted arrival distance: every stop contributes the kilometres
+travelled before it is reached times its priority weight, so a Critical
+complaint a little out of the way is still visited before a Low one next
+door, while stops of equal priority come out as a short path.
+
+With ``e_k`` the leg into position ``k`` and ``W_k`` the total weight of the
+stops from ``k`` on, that cost is ``sum(e_k * W_k)``. The heuristic is:
+
+- nearest neighbour, where the next stop is the one with the smallest
+  distance / weight;
+- then 2-opt: reversing positions ``i..j`` only changes the two boundary legs
+  (multiplied by ``W_i`` and ``W_{j+1}``, which don't change) and the
+  multipliers of the legs inside, which become ``W_i + W_{j+1} - W_k``. With
+  prefix sums of ``e`` and ``e * W`` the change of every ``(i, j)`` pair is a
+  handful of array operations. Each round applies the best reversals that
+  don't share a leg, until none improves.
+
+Distances are great-circle kilometres (the haversine of ``scoring``) from one
+vectorised matrix. Solved orders are cached per worker and reused until the
+set of tasks, their priorities, locations or the starting point change.
+"""
+import threading
+from collections import OrderedDict
+
+EARTH_RADIUS_KM = 6371  # as in scoring.haversine
+
+# Statuses of the tasks a worker still has to visit.
+OPEN_STATUSES = ('assigned', 'in_progress')
+
+PRIORITY_WEIGHTS = {'Critical': 8.0, 'High': 4.0, 'Medium': 2.0, 'Low': 1.0}
+DEFAULT_WEIGHT = 1.0
+
+# 2-opt stops improving well before this; it only bounds pathological inputs.
+MAX_ROUNDS = 2000
+
+
+def priority_weight(priority):
+    return PRIORITY_WEIGHTS.get(priority, DEFAULT_WEIGHT)
+
+
+def distance_matrix(latitudes, longitudes):
+    """Pairwise haversine distances in km, as an ``n x n`` float array."""
+    import numpy as np
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def route_cost(order, dist, weights):
+    """Priority-weighted arrival distance of ``order`` (which starts with the start point, 0)."""
+    import numpy as np
+    order = np.asarray(order)
+    legs = dist[order[:-1], order[1:]]
+    return float(np.dot(np.cumsum(legs), weights[order[1:]]))
+
+
+def nearest_neighbour(dist, weights):
+    """Greedy order from point 0: always go to the stop with the least distance per unit of weight."""
+    import numpy as np
+    n = len(weights)
+    order = [0]
+    remaining = np.ones(n, dtype=bool)
+    remaining[0] = False
+    per_weight = dist / np.where(weights > 0, weights, 1.0)[None, :]  # the start has weight 0
+    for _ in range(n - 1):
+        ratio = np.where(remaining, per_weight[order[-1]], np.inf)
+        nxt = int(np.argmin(ratio))
+        order.append(nxt)
+        remaining[nxt] = False
+    return np.array(order)
+
+
+def two_opt(order, dist, weights, max_rounds=MAX_ROUNDS, batch=32):
+    """Improve ``order`` with segment reversals; position 0 stays put.
+
+    Each round evaluates every reversal and applies the best ones whose legs
+    don't overlap: their changes are independent, so they add up.
+    """
+    import numpy as np
+    order = np.array(order)
+    n = len(order) - 1  # stops after the start
+    if n < 2:
+        return order
+    i, j = np.triu_indices(n + 1, k=1)
+    keep = i >= 1
+    i, j = i[keep], j[keep]
+    has_next = j < n
+    # Flat indexes into the distance matrix reordered by position.
+    boundary_first = (i - 1) * (n + 1) + j
+    boundary_last = i * (n + 1) + np.minimum(j + 1, n)
+    tolerance = 1e-9 * max(float(dist.max()) * float(weights.sum()), 1.0)
+
+    for _ in range(max_rounds):
+        D = dist[np.ix_(order, order)].ravel()
+        # W[k]: weight of positions k..n; e[k]: leg into position k (0 past the end).
+        W = np.zeros(n + 2)
+        W[:n + 1] = np.cumsum(weights[order][::-1])[::-1]
+        e = np.zeros(n + 2)
+        e[1:n + 1] = D[1::n + 2][:n]  # the diagonal just above the main one
+        E = np.cumsum(e[:n + 1])
+        F = np.cumsum(e[:n + 1] * W[:n + 1])
+
+        first = W[i] * (D[boundary_first] - e[i])
+        last = np.where(has_next, W[j + 1] * (D[boundary_last] - e[j + 1]), 0.0)
+        inner = (W[i] + W[j + 1]) * (E[j] - E[i]) - 2 * (F[j] - F[i])
+        delta = first + last + inner
+
+        candidates = np.flatnonzero(delta < -tolerance)
+        if not len(candidates):
+            break
+        if len(candidates) > batch:
+            candidates = candidates[np.argpartition(delta[candidates], batch)[:batch]]
+        candidates = candidates[np.argsort(delta[candidates])]
+        # Reversing i..j changes legs i..j+1; accept moves whose legs are disjoint.
+        taken = np.zeros(n + 2, dtype=bool)
+        for k in candidates:
+            a, b = i[k], j[k]
+            if not taken[a:b + 2].any():
+                taken[a:b + 2] = True
+                order[a:b + 1] = order[a:b + 1][::-1]
+    return order
+
+
+def solve(start, stops, weights):
+    """Visiting order for ``stops`` from ``start``.
+
+    ``start`` is a ``(lat, lon)`` pair, ``stops`` a list of them and
+    ``weights`` their priority weights. Returns ``(indexes into stops, legs
+    in km)``.
+    """
+    import numpy as np
+    if not stops:
+        return [], []
+    points = [start, *stops]
+    dist = distance_matrix([p[0] for p in points], [p[1] for p in points])
+    w = np.concatenate([[0.0], np.asarray(weights, dtype=float)])
+    order = two_opt(nearest_neighbour(dist, w), dist, w)
+    legs = dist[order[:-1], order[1:]]
+    return [int(k) - 1 for k in order[1:]], [float(leg) for leg in legs]
+
+
+class RouteCache:
+    """Solved orders per worker, kept while the worker's task set is unchanged."""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._routes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, worker_id, signature):
+        with self._lock:
+            cached = self._routes.get(worker_id)
+            if cached is None or cached[0] != signature:
+                return None
+            self._routes.move_to_end(worker_id)
+            return cached[1]
+
+    def put(self, worker_id, signature, route):
+        with self._lock:
+            self._routes[worker_id] = (signature, route)
+            self._routes.move_to_end(worker_id)
+            while len(self._routes) > self.max_workers:
+                self._routes.popitem(last=False)
+
+    def __len__(self):
+        return len(self._routes)
+
+
+def plan(cache, worker_id, start, tasks):
+    """Order ``tasks`` (complaints with coordinates) from ``start``, reusing ``cache``.
+
+    Returns ``(ordered tasks, legs in km, whether it came from the cache)``.
+    """
+    signature = (start, tuple(sorted((task.id, task.latitude, task.longitude, task.priority) for task in tasks)))
+    by_id = {task.id: task for task in tasks}
+    cached = cache.get(worker_id, signature)
+    if cached is not None:
+        ids, legs = cached
+        return [by_id[task_id] for task_id in ids], legs, True
+    order, legs = solve(start, [(task.latitude, task.longitude) for task in tasks],
+                        [priority_weight(task.priority) for task in tasks])
+    ids = [tasks[k].id for k in order]
+    cache.put(worker_id, signature, (ids, legs))
+    return [by_id[task_id] for task_id in ids], legs, False
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(config):
+    """The process-wide route cache, sized from ``ROUTE_CACHE_SIZE`` on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RouteCache(config['ROUTE_CACHE_SIZE'])
+    return _cache
+
+
+def reset_cache():
+    """Drop the process-wide cache (tests and benchmarks switch databases)."""
+    global _cache
+    with _cache_lock:
+        _cache = None
@@ -0,0 +1,77 @@
+"""Create and upgrade the database schema in place.
+
+There are no migrations; ``upgrade`` is idempotent and brings an existing
+database up to date with ``models.py`` (new columns, indexes, backfills).
+"""
+import logging
+
+from sqlalchemy import inspect, text
+
+import search
+from extensions import db
+from models import Complaint
+from scoring import parse_location
+
+logger = logging.getLogger('snapfix.schema')
+
+BACKFILL_BATCH = 1000
+
+# Columns added after the first release: (table, column, DDL type).
+ADDED_COLUMNS = [
+    ('complaints', 'latitude', 'FLOAT'),
+    ('complaints', 'longitude', 'FLOAT'),
+    ('complaints', 'parent_id', 'INTEGER'),
+]
+
+
+def _add_missing_columns():
+    inspector = inspect(db.engine)
+    existing = {table: {column['name'] for column in inspector.get_columns(table)}
+                for table in {table for table, _, _ in ADDED_COLUMNS}}
+    with db.engine.begin() as conn:
+        for table, column, ddl_type in ADDED_COLUMNS:
+            if column not in existing[table]:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl_type}'))
+                logger.info('column added', extra={'table': table, 'column': column})
+
+
+def _create_missing_indexes():
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def backfill_coordinates():
+    """Fill ``latitude``/``longitude`` from ``location`` for rows that predate the columns."""
+    last_id = 0
+    total = 0
+    while True:
+        rows = (db.session.query(Complaint.id, Complaint.location)
+                .filter(Complaint.id > last_id, Complaint.latitude.is_(None), Complaint.location.isnot(None))
+                .order_by(Complaint.id)
+                .limit(BACKFILL_BATCH)
+                .all())
+        if not rows:
+            break
+        last_id = rows[-1].id
+        updates = []
+        for complaint_id, location in rows:
+            lat, lon = parse_location(location)
+            if lat is not None:
+                updates.append({'id': complaint_id, 'latitude': lat, 'longitude': lon})
+        if updates:
+            db.session.bulk_update_mappings(Complaint, updates)
+        db.session.commit()
+        total += len(updates)
+    return total
+
+
+def upgrade():
+    """Create missing tables, columns and indexes. Needs an app context."""
+    db.create_all()
+    _add_missing_columns()
+    _create_missing_indexes()
+    filled = backfill_coordinates()
+    if filled:
+        logger.info('coordinates backfilled', extra={'complaints': filled})
+    search.ensure_index()
@@ -0,0 +1,54 @@
+import math
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    R = 6371  # Earth radius in km
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+
+    a = math.sin(dphi/2)**2 + \
+        math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
+    return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+
+def parse_location(location):
+    """Split a ``"lat, lon"`` location string into floats; ``(None, None)`` if it isn't one."""
+    try:
+        lat, lon = (float(part) for part in location.split(','))
+    except (AttributeError, ValueError):
+        return None, None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None, None
+    return lat, lon
+
+
+def parse_bbox(value):
+    """Parse ``"min_lat,min_lon,max_lat,max_lon"``; raises ``ValueError`` if malformed."""
+    try:
+        min_lat, min_lon, max_lat, max_lon = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError("'bbox' must be min_lat,min_lon,max_lat,max_lon")
+    if min_lat > max_lat or min_lon > max_lon:
+        raise ValueError("'bbox' minimums must not exceed maximums")
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def compute_score(worker, complaint):
+    lat, lon = map(float, complaint.location.split(", "))
+    distance = haversine(
+        float(worker.latitude), float(worker.longitude),
+        lat, lon
+    )
+
+    workload = 1
+
+    if worker.workload == "Free":
+        workload = 0
+
+    score = (
+        0.6 * distance +
+        0.3 * (worker.active_tasks or 0) +
+        0.1 * workload
+    )
+    return score
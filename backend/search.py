@@ -0,0 +1,206 @@
+"""Full-text search over complaint titles and descriptions.
+
+Postgres uses an expression GIN index on ``to_tsvector(title || description)``,
+which the database keeps current on its own. SQLite (local development and
+tests) uses an FTS5 table, ``complaints_fts``, keyed by complaint id. The
+``index_complaint``/``remove_complaint`` hooks keep that table in sync; on
+Postgres they do nothing.
+
+Results are ranked when there is a text query and otherwise newest first,
+and are paged with an opaque keyset cursor rather than OFFSET.
+"""
+import base64
+import json
+import logging
+import re
+from datetime import datetime
+
+from sqlalchemy import Float, and_, cast, column, func, literal_column, or_, select, table, text
+
+from extensions import db
+from models import Complaint
+
+logger = logging.getLogger('snapfix.search')
+
+TS_CONFIG = 'english'
+FTS_TABLE = 'complaints_fts'
+PG_INDEX = 'ix_complaints_fts'
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+# Orders a cursor can belong to: search by relevance when ``q`` is given, else
+# newest first; exports (export.py) by ``updated_at``.
+RANKED = 'rank'
+NEWEST = 'newest'
+UPDATED = 'updated'
+
+
+class SearchError(ValueError):
+    """Invalid search parameters; the message is safe to show to the client."""
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def _pg_document():
+    return func.to_tsvector(TS_CONFIG, func.coalesce(Complaint.title, '') + ' ' +
+                            func.coalesce(Complaint.description, ''))
+
+
+def ensure_index():
+    """Create the text index if it doesn't exist yet."""
+    dialect = _dialect()
+    with db.engine.begin() as conn:
+        if dialect == 'postgresql':
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON complaints USING GIN "
+                f"(to_tsvector('{TS_CONFIG}', coalesce(title, '') || ' ' || coalesce(description, '')))"
+            ))
+        elif dialect == 'sqlite':
+            exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                                  {'name': FTS_TABLE}).first()
+            if not exists:
+                conn.execute(text(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, description)"))
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}(rowid, title, description) "
+                                  f"SELECT id, title, description FROM complaints"))
+        else:
+            logger.warning('no full-text index for this database', extra={'dialect': dialect})
+
+
+def drop_index():
+    """Drop the SQLite FTS table (no-op on Postgres)."""
+    if _dialect() != 'sqlite':
+        return
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+def rebuild_index():
+    """Repopulate the SQLite FTS table from ``complaints`` (no-op on Postgres)."""
+    if _dialect() != 'sqlite':
+        return
+    drop_index()
+    ensure_index()
+
+
+def index_complaint(complaint):
+    """Add or refresh ``complaint`` in the index, in the caller's transaction."""
+    if _dialect() != 'sqlite':
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': complaint.id})
+    db.session.execute(text(f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (:id, :title, :description)"),
+                       {'id': complaint.id, 'title': complaint.title, 'description': complaint.description})
+
+
+def remove_complaint(complaint_id):
+    """Drop a complaint from the index, in the caller's transaction."""
+    if _dialect() != 'sqlite':
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': complaint_id})
+
+
+def remove_complaints(complaint_ids):
+    """Drop several complaints from the index, in the caller's transaction."""
+    if _dialect() != 'sqlite' or not complaint_ids:
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({','.join(str(int(i)) for i in complaint_ids)})"))
+
+
+def encode_cursor(mode, sort_key, complaint_id):
+    """An opaque cursor for the row after ``(sort_key, complaint_id)`` in a search sorted by ``mode``."""
+    if isinstance(sort_key, datetime):
+        sort_key = sort_key.isoformat()
+    raw = json.dumps([mode, sort_key, complaint_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, mode):
+    """Return ``(sort_key, complaint_id)``; the cursor must come from a search sorted by ``mode``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_mode, sort_key, complaint_id = json.loads(raw)
+        if cursor_mode in (NEWEST, UPDATED):
+            sort_key = datetime.fromisoformat(sort_key)
+        elif cursor_mode == RANKED:
+            sort_key = float(sort_key)
+        else:
+            raise ValueError(cursor_mode)
+        complaint_id = int(complaint_id)
+    except (ValueError, TypeError):
+        raise SearchError('Invalid cursor')
+    if cursor_mode != mode:
+        # A relevance score compared with created_at (or the reverse) silently matches nothing.
+        raise SearchError("Cursor does not match this search: results with and without 'q' are sorted differently")
+    return sort_key, complaint_id
+
+
+def _text_match(query_text):
+    """Return ``(filter, rank)`` expressions for ``query_text``; higher rank is better."""
+    tokens = _TOKEN.findall(query_text)
+    if not tokens:
+        raise SearchError('Search query has no searchable words')
+
+    if _dialect() == 'postgresql':
+        ts_query = func.plainto_tsquery(TS_CONFIG, ' '.join(tokens))
+        document = _pg_document()
+        # ts_rank_cd is float4; widen it so cursor values round-trip exactly through JSON.
+        return document.op('@@')(ts_query), cast(func.ts_rank_cd(document, ts_query), Float)
+
+    # FTS5: quote every token so user input can't inject query syntax; tokens are ANDed.
+    match = ' '.join('"%s"' % token for token in tokens)
+    fts = table(FTS_TABLE, column('rowid'))
+    matching = (select(fts.c.rowid)
+                .where(text(f'{FTS_TABLE} MATCH :match_filter').bindparams(match_filter=match)))
+    # bm25() only works inside a query that MATCHes the FTS table, hence the correlated subquery.
+    rank = (select(literal_column(f'-bm25({FTS_TABLE})'))
+            .select_from(fts)
+            .where(text(f'{FTS_TABLE} MATCH :match_rank').bindparams(match_rank=match),
+                   fts.c.rowid == Complaint.id)
+            .scalar_subquery())
+    return Complaint.id.in_(matching), rank
+
+
+def search_complaints(query, q=None, statuses=None, categories=None, priorities=None,
+                      date_from=None, date_to=None, bbox=None, cursor=None, limit=20):
+    """Apply filters, ranking and keyset paging to ``query`` (a Complaint query).
+
+    Returns ``(complaints, next_cursor)``.
+    """
+    if statuses:
+        query = query.filter(Complaint.status.in_(statuses))
+    if categories:
+        query = query.filter(Complaint.category.in_(categories))
+    if priorities:
+        query = query.filter(Complaint.priority.in_(priorities))
+    if date_from:
+        query = query.filter(Complaint.created_at >= date_from)
+    if date_to:
+        query = query.filter(Complaint.created_at < date_to)
+    if bbox:
+        min_lat, min_lon, max_lat, max_lon = bbox
+        query = query.filter(Complaint.latitude.between(min_lat, max_lat),
+                             Complaint.longitude.between(min_lon, max_lon))
+
+    if q:
+        match, sort_key = _text_match(q)
+        query = query.filter(match)
+        mode = RANKED
+    else:
+        sort_key = Complaint.created_at
+        mode = NEWEST
+
+    if cursor:
+        last_key, last_id = decode_cursor(cursor, mode)
+        query = query.filter(or_(sort_key < last_key, and_(sort_key == last_key, Complaint.id < last_id)))
+
+    rows = (query.add_columns(sort_key.label('sort_key'))
+            .order_by(sort_key.desc(), Complaint.id.desc())
+            .limit(limit + 1)
+            .all())
+
+    complaints = [complaint for complaint, _ in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last_complaint, last_key = rows[limit - 1]
+        next_cursor = encode_cursor(mode, last_key, last_complaint.id)
+    return complaints, next_cursor
@@ -0,0 +1,89 @@
+"""The JSON shape of each model, shared by every route that returns it.
+
+Datetimes are returned as ``datetime`` objects; the app's JSON provider
+(responses.py) writes them as ISO 8601.
+"""
+
+
+def complaint_summary(complaint):
+    """A complaint as it appears in lists and search results."""
+    return {
+        'id': complaint.id,
+        'title': complaint.title,
+        'description': complaint.description,
+        'category': complaint.category,
+        'status': complaint.status,
+        'priority': complaint.priority,
+        'location': complaint.location,
+        'image_url': complaint.image_url,
+        'user_name': complaint.user.name,
+        'worker_name': complaint.worker.name if complaint.worker else None,
+        'created_at': complaint.created_at,
+        'updated_at': complaint.updated_at,
+        'archived': complaint.archived,
+    }
+
+
+def complaint_brief(complaint):
+    """A complaint in the admin dashboard's recent list."""
+    return {
+        'id': complaint.id,
+        'title': complaint.title,
+        'category': complaint.category,
+        'status': complaint.status,
+        'created_at': complaint.created_at,
+    }
+
+
+def complaint_update(update):
+    return {
+        'id': update.id,
+        'message': update.message,
+        'updated_by': update.user.name,
+        'created_at': update.created_at,
+    }
+
+
+def complaint_detail(complaint):
+    """A single complaint with the reporter's contact details and its update history."""
+    data = complaint_summary(complaint)
+    data.update({
+        'user_email': complaint.user.email,
+        'user_phone': complaint.user.phone,
+        'parent_id': complaint.parent_id,
+        'updates': [complaint_update(update) for update in complaint.updates],
+    })
+    return data
+
+
+def user_summary(user):
+    return {
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+        'phone': user.phone,
+        'role': user.role,
+        'created_at': user.created_at,
+    }
+
+
+def worker_summary(worker, assigned_complaints):
+    """A worker in the admin list; ``assigned_complaints`` counts hot and archived complaints."""
+    return {
+        'id': worker.id,
+        'name': worker.name,
+        'email': worker.email,
+        'phone': worker.phone,
+        'assigned_complaints': assigned_complaints,
+        'workload': worker.workload,
+    }
+
+
+def worker_contact(worker):
+    """What the admin mail form needs to address a worker."""
+    return {
+        'id': worker.id,
+        'name': worker.name,
+        'email': worker.email,
+        'role': worker.role,
+    }
@@ -0,0 +1,173 @@
+"""Tests for archiving closed complaints.
+
+Run with ``python -m pytest test_archive.py`` from the backend folder.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+
+import archive
+from extensions import db
+from models import ArchivedComplaint, ArchivedComplaintUpdate, Complaint, ComplaintUpdate, User
+
+OLD = datetime.utcnow() - timedelta(days=400)
+
+
+@pytest.fixture
+def app(make_app, auth_header):
+    app = make_app()
+    with app.app_context():
+        admin = User(name='Admin', email='admin@test', password='x', role='admin')
+        citizen = User(name='Citizen', email='citizen@test', password='x', role='user')
+        worker = User(name='Worker', email='worker@test', password='x', role='worker',
+                      latitude='17.71', longitude='83.31')
+        db.session.add_all([admin, citizen, worker])
+        db.session.flush()
+        ids = {}
+        rows = [
+            # name, status, age in days, parent
+            ('old-done', 'completed', 400, None),
+            ('old-rejected', 'rejected', 300, None),
+            ('incident', 'completed', 390, None),
+            ('report', 'completed', 390, 'incident'),
+            ('old-open', 'pending', 400, None),
+            ('recent-done', 'completed', 5, None),
+            ('newest-done', 'completed', 200, None),
+        ]
+        for i, (name, status, age, parent) in enumerate(rows):
+            stamp = datetime.utcnow() - timedelta(days=age)
+            complaint = Complaint(title=name, description=f'{name} description', category='water',
+                                  status=status, priority='High' if i % 2 else 'Low', user_id=citizen.id,
+                                  worker_id=worker.id, parent_id=ids.get(parent),
+                                  location='17.7, 83.3', latitude=17.7, longitude=83.3, created_at=stamp, updated_at=stamp)
+            db.session.add(complaint)
+            db.session.flush()
+            ids[name] = complaint.id
+        db.session.add(ComplaintUpdate(complaint_id=ids['old-done'], message='Fixed', updated_by=worker.id,
+                                       created_at=OLD))
+        db.session.commit()
+        app.ids = ids
+        app.test_headers = {role: auth_header(user) for role, user in
+                            (('admin', admin), ('citizen', citizen), ('worker', worker))}
+    return app
+
+
+def _archive(app, **kwargs):
+    with app.app_context():
+        return archive.archive_closed(kwargs.pop('days', 180), kwargs.pop('batch_size', 500), **kwargs)
+
+
+def _archived_titles(app):
+    with app.app_context():
+        return sorted(complaint.title for complaint in ArchivedComplaint.query)
+
+
+def test_moves_old_closed_complaints_in_batches(app):
+    assert _archive(app, batch_size=1, max_batches=2) == 2
+    assert _archive(app) == 3
+    # The incident waited for its report.
+    assert _archived_titles(app) == ['incident', 'newest-done', 'old-done', 'old-rejected', 'report']
+    assert _archive(app) == 0
+
+    with app.app_context():
+        assert sorted(complaint.title for complaint in Complaint.query) == ['old-open', 'recent-done']
+        assert ComplaintUpdate.query.count() == 0
+        assert [update.message for update in ArchivedComplaintUpdate.query] == ['Fixed']
+        assert archive.counts('status') == {'completed': 4, 'rejected': 1}
+
+    result = app.test_cli_runner().invoke(args=['archive-complaints', '--days', '1'])
+    assert result.output.strip() == '1 complaint(s) archived'  # recent-done is the only one left
+
+
+def test_reads_include_archived_complaints(app):
+    client = app.test_client()
+    admin, citizen = app.test_headers['admin'], app.test_headers['citizen']
+    analytics_before = client.get('/api/analytics', headers=admin).get_json()
+    _archive(app)
+
+    analytics = client.get('/api/analytics', headers=admin).get_json()
+    for key in ('total_complaints', 'status_breakdown', 'category_breakdown', 'priority_breakdown'):
+        assert analytics[key] == analytics_before[key], key
+
+    workers = client.get('/api/workers', headers=admin).get_json()['data']
+    assert [(worker['name'], worker['assigned_complaints']) for worker in workers] == [('Worker', 7)]
+
+    detail = client.get(f"/api/complaints/{app.ids['old-done']}", headers=citizen).get_json()
+    assert detail['archived'] is True and [u['message'] for u in detail['updates']] == ['Fixed']
+    assert client.get('/api/complaints/9999', headers=citizen).status_code == 404
+
+    everything = client.get('/api/allcomplaints', headers=citizen).get_json()['data']
+    assert len(everything) == 7
+    page = client.get('/api/complaints?page=2&limit=3', headers=app.test_headers['worker']).get_json()
+    assert page['total_items'] == 7 and page['total_pages'] == 3
+    assert [row['title'] for row in page['data']] == ['report', 'incident', 'old-open']
+
+    # The admin queue is hot-only unless asked.
+    assert client.get('/api/complaints?limit=50', headers=admin).get_json()['total_items'] == 2
+    with_archive = client.get('/api/complaints?limit=50&include_archived=1', headers=admin).get_json()
+    assert with_archive['total_items'] == 7
+
+    lines = client.get('/api/export/complaints', headers=admin).get_data(as_text=True).splitlines()
+    exported = {record['title']: record for record in map(json.loads, lines)}
+    assert len(exported) == 7
+    assert [u['message'] for u in exported['old-done']['updates']] == ['Fixed']
+
+
+def test_updating_restores_and_deleting_removes(app):
+    client = app.test_client()
+    admin = app.test_headers['admin']
+    _archive(app)
+
+    response = client.put(f"/api/complaints/{app.ids['old-done']}", headers=admin,
+                          json={'status': 'pending', 'message': 'Reopened'})
+    assert response.status_code == 200
+    with app.app_context():
+        complaint = db.session.get(Complaint, app.ids['old-done'])
+        assert complaint.status == 'pending'
+        assert [update.message for update in complaint.updates] == ['Fixed', 'Reopened']
+        assert archive.get(app.ids['old-done']) is None
+        assert archive.counts('status') == {'completed': 3, 'rejected': 1}
+
+    assert client.delete(f"/api/complaints/{app.ids['incident']}", headers=admin).status_code == 200
+    with app.app_context():
+        assert archive.get(app.ids['incident']) is None
+        assert archive.get(app.ids['report']).parent_id is None
+        assert archive.counts('status') == {'completed': 2, 'rejected': 1}
+
+
+def test_ids_of_archived_rows_are_not_reused(app):
+    client = app.test_client()
+    admin = app.test_headers['admin']
+    _archive(app)  # takes the newest complaint and the only (so newest) update
+
+    # A new note must not take the archived update's id, or restoring its complaint fails.
+    response = client.put(f"/api/complaints/{app.ids['old-open']}", headers=app.test_headers['worker'],
+                          json={'message': 'On my way'})
+    assert response.status_code == 200
+    assert client.put(f"/api/complaints/{app.ids['old-done']}", headers=admin,
+                      json={'status': 'pending', 'message': 'Reopened'}).status_code == 200
+
+    # Nor may a new complaint take an archived complaint's id once the newest hot one is deleted.
+    assert client.delete(f"/api/complaints/{app.ids['recent-done']}", headers=admin).status_code == 200
+    with app.app_context():
+        fresh = Complaint(title='fresh', description='fresh', category='water',
+                          user_id=Complaint.query.first().user_id)
+        db.session.add(fresh)
+        db.session.commit()
+        assert fresh.id > app.ids['newest-done']
+        ids = db.session.scalars(select(archive.all_complaints().c.id)).all()
+        assert len(ids) == len(set(ids))
+
+
+def test_refuses_sqlite_tables_that_reuse_ids(app):
+    with app.app_context():
+        db.session.execute(text('ALTER TABLE complaint_updates RENAME TO complaint_updates_old'))
+        db.session.execute(text('CREATE TABLE complaint_updates (id INTEGER PRIMARY KEY, complaint_id INTEGER, '
+                                'message TEXT, updated_by INTEGER, created_at DATETIME)'))
+        db.session.commit()
+    with pytest.raises(archive.ArchiveError):
+        _archive(app)
+    result = app.test_cli_runner().invoke(args=['archive-complaints'])
+    assert result.exit_code != 0 and 'AUTOINCREMENT' in result.output
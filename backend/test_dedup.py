@@ -0,0 +1,134 @@
+"""Tests for near-duplicate detection on complaint submission.
+
+Run with ``python -m pytest test_dedup.py`` from the backend folder.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import dedup
+import ml
+from extensions import db
+from models import Complaint, User
+
+
+class StubPriorityModel:
+    def predict(self, X):
+        return ['P2']
+
+    def predict_proba(self, X):
+        return [[0.1, 0.9]]
+
+
+@pytest.fixture
+def app(make_app, auth_header):
+    ml.preload('priority_model', StubPriorityModel())
+    dedup.reset_index()
+    app = make_app()
+    with app.app_context():
+        admin = User(name='Admin', email='admin@test', password='x', role='admin')
+        citizen = User(name='Citizen', email='citizen@test', password='x', role='user')
+        db.session.add_all([admin, citizen])
+        db.session.commit()
+        app.test_headers = {'admin': auth_header(admin), 'citizen': auth_header(citizen)}
+    yield app
+    dedup.reset_index()
+    ml._loaded.pop('priority_model', None)
+
+
+def _submit(client, headers, description, location, category='water'):
+    response = client.post('/api/complaints', headers=headers, data={
+        'title': description[:30], 'description': description, 'category': category, 'location': location,
+    })
+    assert response.status_code == 201, response.json
+    return response.json
+
+
+def test_similar_nearby_report_is_linked_to_the_open_incident(app):
+    client = app.test_client()
+    headers = app.test_headers['citizen']
+    first = _submit(client, headers, 'Water pipe burst and the street is flooded', '17.7000, 83.3000')
+    second = _submit(client, headers, 'Pipe burst, water flooding the street', '17.7010, 83.3005')
+    third = _submit(client, headers, 'Pipe burst flooding street with water', '17.7005, 83.3010')
+
+    assert 'duplicate_of' not in first
+    assert second['duplicate_of'] == first['id']
+    # Linked to the root incident, not to the report it happened to resemble most.
+    assert third['duplicate_of'] == first['id']
+    with app.app_context():
+        assert db.session.get(Complaint, second['id']).status == dedup.DUPLICATE
+
+
+def test_distant_or_different_reports_stay_separate(app):
+    client = app.test_client()
+    headers = app.test_headers['citizen']
+    first = _submit(client, headers, 'Water pipe burst and the street is flooded', '17.7000, 83.3000')
+    far_away = _submit(client, headers, 'Water pipe burst and the street is flooded', '17.7500, 83.3000')
+    other_issue = _submit(client, headers, 'Tree fallen across the road', '17.7001, 83.3001', category='tree')
+    no_location = _submit(client, headers, 'Water pipe burst and the street is flooded', '')
+
+    for response in (far_away, other_issue, no_location):
+        assert 'duplicate_of' not in response
+    assert first['id'] != far_away['id']
+
+
+def test_closing_the_incident_closes_its_duplicates(app):
+    client = app.test_client()
+    headers = app.test_headers['citizen']
+    first = _submit(client, headers, 'Water pipe burst and the street is flooded', '17.7000, 83.3000')
+    second = _submit(client, headers, 'Pipe burst, water flooding the street', '17.7010, 83.3005')
+    assert second['duplicate_of'] == first['id']
+
+    response = client.put(f"/api/complaints/{first['id']}", json={'status': 'completed'},
+                          headers=app.test_headers['admin'])
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.get(Complaint, second['id']).status == 'completed'
+
+    # The closed incident is no longer a dedup target.
+    third = _submit(client, headers, 'Water pipe burst and the street is flooded', '17.7000, 83.3000')
+    assert 'duplicate_of' not in third
+
+
+def test_index_expires_old_entries_and_catches_up_from_the_database(app):
+    now = datetime.utcnow()
+    with app.app_context():
+        citizen = User.query.filter_by(email='citizen@test').one()
+        # Written by "another process": only visible to this one through sync().
+        for age_hours in (1, 100):
+            db.session.add(Complaint(title='Leak', description='Water pipe burst and the street is flooded',
+                                     category='water', location='17.7, 83.3', latitude=17.7, longitude=83.3,
+                                     user_id=citizen.id, created_at=now - timedelta(hours=age_hours)))
+        db.session.commit()
+
+        index = dedup.DuplicateIndex(window_hours=72)
+        assert index.sync(ml.tfidf_vectorizer().transform, now) == 1
+        vector = ml.text_vector('Pipe burst, water flooding the street')
+        assert len(index.candidates('water', 17.7, 83.3, vector, now)) == 1
+        assert index.candidates('water', 17.7, 83.3, vector, now + timedelta(hours=72)) == []
+        assert len(index) == 0
+
+
+def test_sync_picks_up_a_lower_id_that_commits_late(app):
+    now = datetime.utcnow()
+    vectorize = ml.tfidf_vectorizer().transform
+    with app.app_context():
+        citizen = User.query.filter_by(email='citizen@test').one()
+
+        def add(complaint_id, description, created_at):
+            db.session.add(Complaint(id=complaint_id, title='t', description=description, category='water',
+                                     location='17.7, 83.3', latitude=17.7, longitude=83.3,
+                                     user_id=citizen.id, created_at=created_at))
+            db.session.commit()
+
+        add(20, 'Water pipe burst and the street is flooded', now - timedelta(seconds=5))
+        index = dedup.DuplicateIndex(window_hours=72)
+        assert index.sync(vectorize, now) == 1
+        # Got its id before complaint 20 but committed after the sync above.
+        add(10, 'Electric pole sparking near the school', now - timedelta(seconds=10))
+        assert index.sync(vectorize, now) == 1
+        assert len(index) == 2
+        # The overlap is read again, but nothing is added twice or brought back once discarded.
+        index.discard(10)
+        assert index.sync(vectorize, now) == 0
+        assert len(index) == 1
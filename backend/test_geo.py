@@ -0,0 +1,134 @@
+"""Tests for the /api/analytics/geo heatmap tiles.
+
+Run with ``python -m pytest test_geo.py`` from the backend folder.
+"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import geo
+from extensions import db
+from models import Complaint, User
+
+
+@pytest.fixture
+def app(make_app, auth_header):
+    geo.reset_index()
+    app = make_app()
+    with app.app_context():
+        admin = User(name='Admin', email='admin@test', password='x', role='admin')
+        citizen = User(name='Citizen', email='citizen@test', password='x', role='user')
+        db.session.add_all([admin, citizen])
+        db.session.flush()
+        rows = [
+            # Two complaints in one zoom-12 tile, one across town, one without coordinates.
+            ('water', 'pending', 'High', 17.7000, 83.3000),
+            ('water', 'completed', 'Low', 17.7010, 83.3010),
+            ('tree', 'pending', 'Medium', 17.8000, 83.2000),
+            ('tree', 'pending', 'Medium', None, None),
+        ]
+        for category, status, priority, lat, lon in rows:
+            db.session.add(Complaint(title='t', description='d', category=category, status=status,
+                                     priority=priority, latitude=lat, longitude=lon, user_id=citizen.id))
+        db.session.commit()
+        app.test_headers = {'admin': auth_header(admin), 'citizen': auth_header(citizen)}
+        app.citizen_id = citizen.id
+    yield app
+    geo.reset_index()
+
+
+def _heatmap(client, headers, query='zoom=12'):
+    response = client.get(f'/api/analytics/geo?{query}', headers=headers)
+    assert response.status_code == 200, response.json
+    return {tile['tile']: tile for tile in response.json['tiles']}
+
+
+def test_tile_coordinates_match_the_slippy_map_scheme():
+    x, y = geo.tile_xy([0.0, 51.5074, -33.8688], [0.0, -0.1278, 151.2093], 10)
+    assert list(zip(x.tolist(), y.tolist())) == [(512, 512), (511, 340), (942, 614)]
+
+
+def test_tiles_count_complaints_per_status_category_and_priority(app):
+    tiles = _heatmap(app.test_client(), app.test_headers['admin'])
+    assert sorted(tile['count'] for tile in tiles.values()) == [1, 2]
+
+    busy = next(tile for tile in tiles.values() if tile['count'] == 2)
+    assert busy['status'] == {'pending': 1, 'completed': 1}
+    assert busy['category'] == {'water': 2}
+    assert busy['priority'] == {'High': 1, 'Low': 1}
+    assert abs(busy['lat'] - 17.70) < 0.1 and abs(busy['lon'] - 83.30) < 0.1
+
+    # Coarse zoom: everything in one tile.
+    assert [tile['count'] for tile in _heatmap(app.test_client(), app.test_headers['admin'], 'zoom=3').values()] == [3]
+
+
+def test_bbox_limits_the_tiles(app):
+    tiles = _heatmap(app.test_client(), app.test_headers['admin'], 'zoom=12&bbox=17.69,83.29,17.71,83.31')
+    assert [tile['count'] for tile in tiles.values()] == [2]
+
+
+def test_changes_are_applied_incrementally(app):
+    client = app.test_client()
+    headers = app.test_headers['admin']
+    before = _heatmap(client, headers)
+
+    with app.app_context():
+        # As written by another process: picked up through updated_at.
+        db.session.add(Complaint(title='t', description='d', category='water', status='pending', priority='High',
+                                 latitude=17.7005, longitude=83.3005, user_id=app.citizen_id))
+        complaint = Complaint.query.filter_by(status='completed').one()
+        complaint.status = 'pending'
+        complaint.updated_at = datetime.utcnow() + timedelta(seconds=1)
+        db.session.commit()
+        far_id = Complaint.query.filter_by(category='tree').first().id
+
+    after = _heatmap(client, headers)
+    busy = next(tile for tile in after.values() if tile['count'] == 3)
+    assert busy['status'] == {'pending': 3}
+    assert busy['priority'] == {'High': 2, 'Low': 1}
+    assert len(after) == len(before)
+
+    assert client.delete(f'/api/complaints/{far_id}', headers=headers).status_code == 200
+    assert [tile['count'] for tile in _heatmap(client, headers).values()] == [3]
+
+
+def test_reload_is_built_off_the_request_path(app, monkeypatch):
+    client = app.test_client()
+    headers = app.test_headers['admin']
+    assert sorted(tile['count'] for tile in _heatmap(client, headers).values()) == [1, 2]
+    index = geo.get_index(app.config)
+    with app.app_context():
+        # Deleted by another process: only a full reload drops it.
+        db.session.delete(Complaint.query.filter_by(category='tree').filter(Complaint.latitude.isnot(None)).one())
+        db.session.commit()
+        completed_id = Complaint.query.filter_by(status='completed').one().id
+
+    building, release = threading.Event(), threading.Event()
+    load_rows = geo.GeoIndex.load_rows
+
+    def slow_load_rows(self, rows):
+        rows = list(rows)
+        building.set()
+        assert release.wait(5)
+        load_rows(self, rows)
+
+    monkeypatch.setattr(geo.GeoIndex, 'load_rows', slow_load_rows)
+    index._loaded_at -= app.config['GEO_RELOAD_SECONDS'] + 1
+
+    # The current index keeps answering while the replacement is built...
+    assert sorted(tile['count'] for tile in _heatmap(client, headers).values()) == [1, 2]
+    assert building.wait(5)
+    assert sorted(tile['count'] for tile in _heatmap(client, headers).values()) == [1, 2]
+    # ...and a delete made meanwhile is not undone by the swap.
+    assert client.delete(f'/api/complaints/{completed_id}', headers=headers).status_code == 200
+    release.set()
+    index._reloader.join(5)
+    assert [tile['count'] for tile in _heatmap(client, headers).values()] == [1]
+
+
+def test_admin_only_and_validated(app):
+    client = app.test_client()
+    assert client.get('/api/analytics/geo', headers=app.test_headers['citizen']).status_code == 403
+    assert client.get('/api/analytics/geo?zoom=30', headers=app.test_headers['admin']).status_code == 400
+    assert client.get('/api/analytics/geo?bbox=1,2', headers=app.test_headers['admin']).status_code == 400
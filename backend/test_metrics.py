@@ -0,0 +1,123 @@
+"""Tests for the metrics registry and ``/metrics``.
+
+Run with ``python -m pytest test_metrics.py`` from the backend folder.
+"""
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import config
+import metrics
+
+
+def _registry():
+    registry = metrics.Registry()
+    counter = registry.register(metrics.Counter('test_events_total', 'Events.', ('kind',)))
+    histogram = registry.register(metrics.Histogram('test_seconds', 'Durations.', buckets=(0.1, 1.0)))
+    return registry, counter, histogram
+
+
+def test_exposition_format():
+    registry, counter, histogram = _registry()
+    counter.inc(kind='say "hi"\\n')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(3)
+
+    assert registry.render().splitlines() == [
+        '# HELP test_events_total Events.',
+        '# TYPE test_events_total counter',
+        'test_events_total{kind="say \\"hi\\"\\\\n"} 1',
+        '# HELP test_seconds Durations.',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{le="0.1"} 1',
+        'test_seconds_bucket{le="1"} 2',
+        'test_seconds_bucket{le="+Inf"} 3',
+        'test_seconds_sum 3.55',
+        'test_seconds_count 3',
+    ]
+
+
+def test_snapshots_of_other_processes_are_summed():
+    registry, counter, histogram = _registry()
+    counter.inc(kind='a')
+    histogram.observe(0.05)
+    other, other_counter, other_histogram = _registry()
+    other_counter.inc(2, kind='a')
+    other_counter.inc(kind='b')
+    other_histogram.observe(0.5)
+
+    exposition = registry.render([other.snapshot()]).splitlines()
+    assert 'test_events_total{kind="a"} 3' in exposition
+    assert 'test_events_total{kind="b"} 1' in exposition
+    assert 'test_seconds_bucket{le="0.1"} 1' in exposition
+    assert 'test_seconds_bucket{le="1"} 2' in exposition
+    assert 'test_seconds_count 2' in exposition
+
+
+def test_exited_workers_are_folded_and_kept():
+    with tempfile.TemporaryDirectory() as directory:
+        metrics.SQL_QUERIES_TOTAL.reset()
+        metrics.SQL_QUERIES_TOTAL.inc(5)
+        metrics.write_snapshot(directory)
+        pid = os.getpid()
+        metrics.fold_exited(directory, pid)
+        metrics.fold_exited(directory, pid)  # already folded: nothing to do
+        assert sorted(os.listdir(directory)) == [metrics.EXITED_SNAPSHOT]
+
+        metrics.SQL_QUERIES_TOTAL.reset()
+        metrics.SQL_QUERIES_TOTAL.inc(2)
+        exposition = metrics.registry.render(metrics.read_snapshots(directory, exclude_pid=pid))
+        assert 'snapfix_sql_queries_total 7' in exposition.splitlines()
+
+        metrics.clear_snapshots(directory)
+        assert os.listdir(directory) == []
+
+
+def test_metrics_endpoint_reports_requests_and_queries(make_app):
+    metrics.registry.reset()
+    client = make_app().test_client()
+    assert client.get('/api/health').status_code == 200
+    assert client.get('/api/nowhere').status_code == 404
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    exposition = response.get_data(as_text=True).splitlines()
+    assert ('snapfix_http_request_duration_seconds_count'
+            '{method="GET",route="/api/health",status="200"} 1') in exposition
+    assert ('snapfix_http_request_duration_seconds_count'
+            '{method="GET",route="<unmatched>",status="404"} 1') in exposition
+    assert 'snapfix_http_request_sql_queries_count{method="GET",route="/api/health"} 1' in exposition
+
+
+def test_profile_header_writes_a_profile(make_app, tmp_path):
+    profiles = tmp_path / 'profiles'
+    client = make_app(PROFILING_ENABLED=True, PROFILING_DIR=str(profiles)).test_client()
+
+    assert 'X-Profile-File' not in client.get('/api/health').headers
+    response = client.get('/api/health', headers={'X-Profile': '1'})
+    assert response.status_code == 200
+    assert os.listdir(profiles) == [response.headers['X-Profile-File']]
+    # The lock is released, so the next request can be profiled too.
+    assert 'X-Profile-File' in client.get('/api/health', headers={'X-Profile': '1'}).headers
+
+    disabled = make_app(PROFILING_DIR=str(profiles)).test_client()
+    assert 'X-Profile-File' not in disabled.get('/api/health', headers={'X-Profile': '1'}).headers
+    # Not relative to wherever the server was started.
+    assert make_app().config['PROFILING_DIR'] == os.path.join(config.BASE_DIR, 'profiles')
+
+
+def test_failed_statements_do_not_leave_a_start_time_behind():
+    engine = create_engine('sqlite://')
+    metrics.SQL_QUERIES_TOTAL.reset()
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text('SELECT * FROM missing'))
+        conn.execute(text('SELECT 1'))
+        assert conn.info['snapfix_query_start'] == []
+    assert 'snapfix_sql_queries_total 2' in metrics.registry.render().splitlines()
+    engine.dispose()
@@ -0,0 +1,97 @@
+"""Tests for the token-bucket rate limiter.
+
+Run with ``python -m pytest test_ratelimit.py`` from the backend folder.
+"""
+import pytest
+
+import ratelimit
+from extensions import db
+from models import User
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def app(make_app, auth_header):
+    app = make_app(
+        MAIL_SUPPRESS_SEND=True,
+        MAIL_DEFAULT_SENDER='snapfix@test',
+        RATELIMIT_PROXY_COUNT=1,
+        RATE_LIMITS={'login': '2/minute', 'send_mail': '1/hour', 'autofill': 'off'},
+    )
+    with app.app_context():
+        users = [User(name=f'U{i}', email=f'u{i}@test', password='x', role='user') for i in range(2)]
+        db.session.add_all(users)
+        db.session.commit()
+        app.test_headers = [auth_header(user) for user in users]
+    return app
+
+
+def test_parse_rate():
+    assert ratelimit.parse_rate('10/minute') == (10, 10 / 60)
+    assert ratelimit.parse_rate('5 / 30s') == (5, 5 / 30)
+    assert ratelimit.parse_rate('100/hours') == (100, 100 / 3600)
+    for off in ('', 'off', '0', None):
+        assert ratelimit.parse_rate(off) is None
+    for bad in ('ten/minute', '10/fortnight', '0/minute', '10'):
+        with pytest.raises(ValueError):
+            ratelimit.parse_rate(bad)
+
+
+def test_memory_bucket_bursts_refills_and_evicts():
+    clock = Clock()
+    storage = ratelimit.MemoryStorage(max_keys=3, clock=clock)
+    capacity, rate = 3, 1.0  # a token per second
+
+    assert [storage.acquire('a', capacity, rate)[0] for _ in range(4)] == [True, True, True, False]
+    allowed, _, retry_after = storage.acquire('a', capacity, rate)
+    assert not allowed and retry_after == pytest.approx(1.0)
+    clock.now += 1.5
+    assert storage.acquire('a', capacity, rate)[0]
+    assert not storage.acquire('a', capacity, rate)[0]
+
+    # Buckets that have refilled completely are dropped as new keys arrive.
+    storage.acquire('b', capacity, rate)
+    clock.now += 10
+    storage.acquire('c', capacity, rate)
+    assert len(storage) == 1
+    # And the least recently used go first when over max_keys.
+    for key in 'defg':
+        storage.acquire(key, capacity, rate)
+    assert len(storage) == 3
+
+
+def test_login_is_limited_per_client_ip(app):
+    client = app.test_client()
+
+    def login(ip):
+        return client.post('/api/login', json={'email': 'nobody@test', 'password': 'x'},
+                           headers={'X-Forwarded-For': f'203.0.113.5, {ip}'})
+
+    assert [login('198.51.100.7').status_code for _ in range(2)] == [401, 401]
+    limited = login('198.51.100.7')
+    assert limited.status_code == 429
+    assert 1 <= int(limited.headers['Retry-After']) <= 30
+    assert login('198.51.100.8').status_code == 401
+
+    exposition = client.get('/metrics').get_data(as_text=True)
+    assert 'snapfix_ratelimit_decisions_total{rule="login",outcome="limited"}' in exposition
+
+
+def test_authenticated_routes_are_limited_per_user(app):
+    client = app.test_client()
+    first, second = app.test_headers
+    form = {'email': 'someone@test', 'subject': 'Hi', 'body': 'Hello'}
+
+    assert client.post('/send-mail', data=form, headers=first).status_code == 200
+    assert client.post('/send-mail', data=form, headers=first).status_code == 429
+    assert client.post('/send-mail', data=form, headers=second).status_code == 200
+
+    # A rule set to "off" is not limited (this fails validation before calling Gemini).
+    assert all(client.post('/api/autofill', headers=first).status_code == 400 for _ in range(3))
@@ -0,0 +1,91 @@
+"""Tests for JSON encoding and response compression.
+
+Run with ``python -m pytest test_responses.py`` from the backend folder.
+"""
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+from flask import Response, jsonify
+
+import responses
+from extensions import db
+from models import Complaint, User
+
+CREATED = datetime(2024, 1, 15, 10, 30, 0, 123456)
+
+
+@pytest.fixture
+def routed_app(make_app, auth_header):
+    def make(**overrides):
+        app = make_app(**overrides)
+
+        @app.route('/test/payload')
+        def payload():
+            return jsonify({'created_at': CREATED, 'rows': [{'id': i, 'name': 'Å pothole'} for i in range(100)]})
+
+        @app.route('/test/small')
+        def small():
+            return jsonify({'ok': True})
+
+        @app.route('/test/stream')
+        def stream():
+            return Response((chunk for chunk in ['{"a":', '1}']), mimetype='application/json')
+
+        with app.app_context():
+            admin = User(name='Admin', email='admin@test', password='x', role='admin')
+            citizen = User(name='Citizen', email='citizen@test', password='x', role='user', created_at=CREATED)
+            db.session.add_all([admin, citizen])
+            db.session.flush()
+            db.session.add(Complaint(title='Leak', description='d', category='water', location='17.7, 83.3',
+                                     user_id=citizen.id, created_at=CREATED))
+            db.session.commit()
+            app.test_headers = auth_header(admin)
+        return app
+    return make
+
+
+@pytest.mark.parametrize('fast_json', [True, False])
+def test_both_encoders_write_iso_dates(routed_app, fast_json):
+    app = routed_app(FAST_JSON=fast_json, COMPRESS_ENABLED=False)
+    if fast_json and responses.orjson is not None:
+        assert isinstance(app.json, responses.OrjsonProvider)
+    client = app.test_client()
+
+    body = client.get('/test/payload').get_json()
+    assert body['created_at'] == CREATED.isoformat()
+    assert body['rows'][0]['name'] == 'Å pothole'
+
+    users = client.get('/api/users', headers=app.test_headers).get_json()
+    assert users['data'][0]['created_at'] == CREATED.isoformat()
+    analytics = client.get('/api/analytics', headers=app.test_headers).get_json()
+    assert analytics['recent_complaints'][0]['created_at'] == CREATED.isoformat()
+
+
+def test_large_json_is_gzipped_when_accepted(routed_app):
+    client = routed_app().test_client()
+    plain = client.get('/test/payload').get_data()
+    assert len(plain) >= 1024
+
+    response = client.get('/test/payload', headers={'Accept-Encoding': 'gzip;q=1.0, br;q=0'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.get_data())) == json.loads(plain)
+
+
+def test_small_refused_and_streamed_responses_are_left_alone(routed_app):
+    client = routed_app().test_client()
+    for path, accept in [('/test/small', 'gzip'), ('/test/payload', 'gzip;q=0, br;q=0'),
+                         ('/test/payload', 'identity'), ('/test/stream', 'gzip')]:
+        response = client.get(path, headers={'Accept-Encoding': accept})
+        assert 'Content-Encoding' not in response.headers, (path, accept)
+        json.loads(response.get_data())
+
+
+def test_choose_encoding():
+    assert responses.choose_encoding(None) is None
+    assert responses.choose_encoding('deflate') is None
+    assert responses.choose_encoding('*') == ('br' if responses.brotli else 'gzip')
+    assert responses.choose_encoding('gzip;q=0.5, br;q=0.9') == ('br' if responses.brotli else 'gzip')
+    assert responses.choose_encoding('gzip, *;q=0') == 'gzip'
@@ -0,0 +1,98 @@
+"""Tests for ordering a worker's open tasks into a route.
+
+Run with ``python -m pytest test_route.py`` from the backend folder.
+"""
+import random
+
+import pytest
+
+import routing
+from extensions import db
+from models import Complaint, User
+
+
+@pytest.fixture
+def app(make_app, auth_header):
+    routing.reset_cache()
+    app = make_app()
+    with app.app_context():
+        admin = User(name='Admin', email='admin@test', password='x', role='admin')
+        citizen = User(name='Citizen', email='citizen@test', password='x', role='user')
+        worker = User(name='Worker', email='worker@test', password='x', role='worker',
+                      latitude='17.700', longitude='83.300')
+        db.session.add_all([admin, citizen, worker])
+        db.session.flush()
+        # Three stops along a line east of the worker, filed far end first.
+        for title, lon, status in (('far', 83.330, 'assigned'), ('middle', 83.320, 'in_progress'),
+                                   ('near', 83.310, 'assigned'), ('done', 83.305, 'completed')):
+            db.session.add(Complaint(title=title, description=title, category='water', status=status,
+                                     priority='Medium', user_id=citizen.id, worker_id=worker.id,
+                                     location=f'17.700, {lon}', latitude=17.700, longitude=lon))
+        db.session.add(Complaint(title='nowhere', description='no location', category='water',
+                                 status='assigned', priority='High', user_id=citizen.id, worker_id=worker.id))
+        db.session.commit()
+        app.worker_id = worker.id
+        app.test_headers = {role: auth_header(user) for role, user in
+                            (('admin', admin), ('citizen', citizen), ('worker', worker))}
+    yield app
+    routing.reset_cache()
+
+
+def _reversed(order, i, j):
+    return [*order[:i], *order[i:j + 1][::-1], *order[j + 1:]]
+
+
+def test_solver_finds_a_2_opt_local_optimum():
+    import numpy as np
+    rng = random.Random(3)
+    stops = [(17.6 + rng.random() * 0.2, 83.2 + rng.random() * 0.2) for _ in range(40)]
+    weights = [rng.choice([1.0, 2.0, 4.0, 8.0]) for _ in stops]
+    order, legs = routing.solve((17.7, 83.3), stops, weights)
+    assert sorted(order) == list(range(len(stops)))
+
+    points = [(17.7, 83.3), *stops]
+    dist = routing.distance_matrix([p[0] for p in points], [p[1] for p in points])
+    w = np.array([0.0, *weights])
+    route = [0, *(k + 1 for k in order)]
+    cost = routing.route_cost(route, dist, w)
+    assert cost <= routing.route_cost(routing.nearest_neighbour(dist, w), dist, w) + 1e-9
+    assert all(routing.route_cost(_reversed(route, i, j), dist, w) >= cost - 1e-9
+               for i in range(1, len(route)) for j in range(i + 1, len(route)))
+    assert legs[0] == pytest.approx(dist[0, route[1]])
+
+
+def test_priority_outweighs_a_short_detour():
+    start = (17.700, 83.300)
+    near, farther = (17.700, 83.310), (17.700, 83.285)  # 1km east, 1.6km west
+    assert routing.solve(start, [near, farther], [1.0, 1.0])[0] == [0, 1]
+    assert routing.solve(start, [near, farther], [routing.priority_weight('Low'),
+                                                  routing.priority_weight('Critical')])[0] == [1, 0]
+    assert routing.solve(start, [], []) == ([], [])
+
+
+def test_route_endpoint_orders_and_caches_open_tasks(app):
+    client = app.test_client()
+    worker = app.test_headers['worker']
+
+    route = client.get('/api/worker/route', headers=worker).get_json()
+    assert [stop['title'] for stop in route['data']] == ['near', 'middle', 'far']
+    assert [stop['stop'] for stop in route['data']] == [1, 2, 3]
+    assert route['total_km'] == pytest.approx(route['data'][-1]['distance_km']) == pytest.approx(3.18, abs=0.05)
+    assert [task['title'] for task in route['unlocated']] == ['nowhere']
+    assert route['start'] == {'latitude': 17.7, 'longitude': 83.3, 'source': 'profile'}
+    assert route['cached'] is False
+    assert client.get('/api/worker/route', headers=worker).get_json()['cached'] is True
+
+    # Finishing a task changes the set, so the route is solved again.
+    with app.app_context():
+        Complaint.query.filter_by(title='near').update({'status': 'completed'})
+        db.session.commit()
+    route = client.get('/api/worker/route?lat=17.7&lon=83.34', headers=worker).get_json()
+    assert [stop['title'] for stop in route['data']] == ['far', 'middle']
+    assert route['start']['source'] == 'request' and route['cached'] is False
+
+    admin = client.get(f'/api/worker/route?worker_id={app.worker_id}', headers=app.test_headers['admin'])
+    assert [stop['title'] for stop in admin.get_json()['data']] == ['middle', 'far']
+    assert client.get('/api/worker/route', headers=app.test_headers['admin']).status_code == 400
+    assert client.get('/api/worker/route', headers=app.test_headers['citizen']).status_code == 403
+    assert client.get('/api/worker/route?lat=95&lon=0', headers=worker).status_code == 400
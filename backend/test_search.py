@@ -0,0 +1,108 @@
+"""Tests for /api/complaints/search on the SQLite FTS5 backend.
+
+Run with ``python -m pytest test_search.py`` from the backend folder.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import search
+from extensions import db
+from models import Complaint, User
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def seeded(app, auth_header):
+    now = datetime(2026, 6, 1, 12, 0)
+    with app.app_context():
+        admin = User(name='Admin', email='admin@test', password='x', role='admin')
+        citizen = User(name='Citizen', email='citizen@test', password='x', role='user')
+        db.session.add_all([admin, citizen])
+        db.session.flush()
+        rows = [
+            ('Burst pipe', 'Water pipe burst, street flooded', 'water', 'pending', 'High', 17.70, 83.30, 0),
+            ('Pipe leak', 'Small water leak near the pipe joint', 'water', 'completed', 'Low', 17.71, 83.31, 1),
+            ('Fallen tree', 'Tree blocking the road', 'tree', 'pending', 'Medium', 17.90, 83.50, 2),
+            ('Water logging', 'Rain water logging after storm', 'water', 'assigned', 'Medium', 17.72, 83.29, 3),
+            ('Sparking pole', 'Electric pole sparking', 'electrical', 'pending', 'Critical', 17.70, 83.30, 4),
+        ]
+        for title, description, category, status, priority, lat, lon, age in rows:
+            complaint = Complaint(title=title, description=description, category=category, status=status,
+                                  priority=priority, location=f'{lat}, {lon}', latitude=lat, longitude=lon,
+                                  user_id=citizen.id, created_at=now - timedelta(days=age))
+            db.session.add(complaint)
+            db.session.flush()
+            search.index_complaint(complaint)
+        db.session.commit()
+        return {'admin': auth_header(admin), 'citizen': auth_header(citizen)}
+
+
+def _titles(response):
+    assert response.status_code == 200, response.json
+    return [row['title'] for row in response.json['data']]
+
+
+def test_text_query_is_ranked_and_filtered(app, seeded):
+    client = app.test_client()
+    titles = _titles(client.get('/api/complaints/search?q=water pipe', headers=seeded['admin']))
+    assert set(titles) == {'Burst pipe', 'Pipe leak'}
+
+    titles = _titles(client.get('/api/complaints/search?q=water&status=pending,assigned&category=water',
+                                headers=seeded['admin']))
+    assert set(titles) == {'Burst pipe', 'Water logging'}
+
+
+def test_geo_date_and_priority_filters(app, seeded):
+    client = app.test_client()
+    titles = _titles(client.get('/api/complaints/search?bbox=17.69,83.28,17.715,83.32&priority=High,Critical',
+                                headers=seeded['admin']))
+    assert set(titles) == {'Burst pipe', 'Sparking pole'}
+
+    titles = _titles(client.get('/api/complaints/search?from=2026-05-30&to=2026-06-01T00:00',
+                                headers=seeded['admin']))
+    assert titles == ['Pipe leak', 'Fallen tree']
+
+
+def test_keyset_paging_visits_every_row_once(app, seeded):
+    client = app.test_client()
+    for query in ('', 'q=water&'):
+        seen, cursor = [], None
+        while True:
+            url = f'/api/complaints/search?{query}limit=2' + (f'&cursor={cursor}' if cursor else '')
+            response = client.get(url, headers=seeded['admin'])
+            seen.extend(_titles(response))
+            cursor = response.json['next_cursor']
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen))
+        expected = 3 if query else 5
+        assert len(seen) == expected
+
+
+def test_removed_complaint_leaves_the_index(app, seeded):
+    client = app.test_client()
+    with app.app_context():
+        complaint = Complaint.query.filter_by(title='Fallen tree').one()
+        search.remove_complaint(complaint.id)
+        db.session.delete(complaint)
+        db.session.commit()
+    assert _titles(client.get('/api/complaints/search?q=tree', headers=seeded['admin'])) == []
+
+
+def test_bad_parameters_are_rejected(app, seeded):
+    client = app.test_client()
+    assert client.get('/api/complaints/search?bbox=1,2', headers=seeded['admin']).status_code == 400
+    assert client.get('/api/complaints/search?cursor=garbage', headers=seeded['admin']).status_code == 400
+    # A cursor only continues the kind of search it came from.
+    ranked = client.get('/api/complaints/search?q=water&limit=1', headers=seeded['admin']).json['next_cursor']
+    newest = client.get('/api/complaints/search?limit=1', headers=seeded['admin']).json['next_cursor']
+    assert client.get(f'/api/complaints/search?cursor={ranked}', headers=seeded['admin']).status_code == 400
+    assert client.get(f'/api/complaints/search?q=water&cursor={newest}', headers=seeded['admin']).status_code == 400
+    assert client.get('/api/complaints/search?from=yesterday', headers=seeded['admin']).status_code == 400
+    # Query syntax characters are treated as plain words, not FTS operators.
+    assert _titles(client.get('/api/complaints/search?q="OR*(', headers=seeded['admin'])) == []
@@ -0,0 +1,66 @@
+"""Startup cost regression tests, based on ``python -X importtime``.
+
+Run with ``python -m pytest test_startup.py`` from the backend folder.
+The budget can be raised on slow machines with STARTUP_BUDGET_MS.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', '1500'))
+
+# Only loaded on demand by ml.py, never at import or app creation.
+HEAVY_MODULES = ('google.generativeai', 'sklearn', 'scipy', 'numpy', 'joblib')
+
+
+def _run(code):
+    env = dict(os.environ, DB='sqlite://', SECRET_KEY='startup-test', LOG_LEVEL='WARNING',
+               PYTHONPATH=BACKEND_DIR)
+    env.pop('WARMUP', None)
+    # Run from an unrelated directory: startup must not depend on the cwd.
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd, env=env,
+                                capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+def _import_times(stderr):
+    """Map module name -> cumulative import time in microseconds."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_importing_app_stays_within_budget():
+    _run('import app')  # warm the bytecode cache so only import work is measured
+    times = _import_times(_run('import app').stderr)
+
+    assert 'app' in times
+    assert times['app'] / 1000 < STARTUP_BUDGET_MS, (
+        f"importing app took {times['app'] / 1000:.0f}ms, budget is {STARTUP_BUDGET_MS:.0f}ms")
+
+
+def test_heavy_dependencies_are_deferred():
+    result = _run(
+        'import sys, app\n'
+        'app.create_app()\n'
+        f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n'
+    )
+    assert result.stdout.strip() == ''
+
+
+def test_gunicorn_preload_loads_the_models():
+    result = _run(
+        'import runpy\n'
+        f'runpy.run_path({os.path.join(BACKEND_DIR, "gunicorn.conf.py")!r})\n'
+        'import ml, wsgi\n'
+        'print(",".join(sorted(ml._loaded)))\n'
+    )
+    assert result.stdout.strip() == 'category_encoder,gemini,priority_model,tfidf_vectorizer'
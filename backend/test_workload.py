@@ -0,0 +1,126 @@
+"""Concurrency stress test for worker workload accounting.
+
+Run with ``python -m pytest test_workload.py`` from the backend folder.
+"""
+import random
+import threading
+from collections import Counter
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from extensions import db
+from models import Complaint, User
+from workload import reconcile_workloads
+
+THREADS = 8
+OPS_PER_THREAD = 40
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+def _seed(app, workers=3, complaints=30):
+    with app.app_context():
+        admin = User(name='Admin', email='admin@test', password='x', role='admin')
+        db.session.add(admin)
+        worker_rows = [User(name=f'W{i}', email=f'w{i}@test', password='x', role='worker',
+                            latitude='17.7', longitude='83.3') for i in range(workers)]
+        # Accounts created before active_tasks had a default start out NULL.
+        worker_rows[0].active_tasks = None
+        db.session.add_all(worker_rows)
+        db.session.flush()
+        rng = random.Random(1)
+        for i in range(complaints):
+            db.session.add(Complaint(title=f'C{i}', description='d', category='water', location='17.7, 83.3',
+                                     user_id=admin.id, worker_id=rng.choice(worker_rows).id, status='assigned'))
+        db.session.commit()
+        worker_ids = [w.id for w in worker_rows]
+        complaint_ids = [c.id for c in Complaint.query.all()]
+        tokens = {user_id: create_access_token(identity=str(user_id)) for user_id in [admin.id] + worker_ids}
+        return admin.id, worker_ids, complaint_ids, tokens
+
+
+def _assert_consistent(app):
+    with app.app_context():
+        db.session.expire_all()
+        for worker in User.query.filter_by(role='worker'):
+            expected = Complaint.query.filter_by(worker_id=worker.id, status='in_progress').count()
+            assert worker.active_tasks == expected, worker.name
+            assert worker.workload == ('Busy' if expected else 'Free'), worker.name
+
+
+def test_concurrent_status_updates_keep_counts_exact(app):
+    admin_id, worker_ids, complaint_ids, tokens = _seed(app)
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def hammer(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        for _ in range(OPS_PER_THREAD):
+            complaint_id = rng.choice(complaint_ids)
+            if rng.random() < 0.2:
+                token, body = tokens[admin_id], {'worker_id': rng.choice(worker_ids)}
+            else:
+                token = tokens[rng.choice(worker_ids)]
+                body = {'status': rng.choice(['in_progress', 'in_progress', 'completed', 'assigned'])}
+            response = client.put(f'/api/complaints/{complaint_id}', json=body,
+                                  headers={'Authorization': f'Bearer {token}'})
+            with lock:
+                statuses[response.status_code] += 1
+
+    threads = [threading.Thread(target=hammer, args=(seed,)) for seed in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses[200] > 0
+    # 409 = lost a compare-and-set race; that request's transaction rolled back as a whole.
+    assert set(statuses) <= {200, 409}, statuses
+    _assert_consistent(app)
+    with app.app_context():
+        assert reconcile_workloads() == 0
+
+
+def test_repeated_in_progress_does_not_double_count(app):
+    admin_id, worker_ids, complaint_ids, tokens = _seed(app, workers=1, complaints=1)
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {tokens[worker_ids[0]]}'}
+    for status in ['in_progress', 'in_progress', 'completed', 'completed']:
+        assert client.put(f'/api/complaints/{complaint_ids[0]}', json={'status': status},
+                          headers=headers).status_code == 200
+    _assert_consistent(app)
+
+
+def test_deleting_an_active_complaint_frees_the_worker(app):
+    admin_id, worker_ids, complaint_ids, tokens = _seed(app, workers=1, complaints=2)
+    client = app.test_client()
+    worker = {'Authorization': f'Bearer {tokens[worker_ids[0]]}'}
+    admin = {'Authorization': f'Bearer {tokens[admin_id]}'}
+    assert client.put(f'/api/complaints/{complaint_ids[0]}', json={'status': 'in_progress'},
+                      headers=worker).status_code == 200
+
+    for complaint_id in complaint_ids:  # in_progress, then assigned
+        assert client.delete(f'/api/complaints/{complaint_id}', headers=admin).status_code == 200
+        _assert_consistent(app)
+    with app.app_context():
+        assert db.session.get(User, worker_ids[0]).workload == 'Free'
+        assert reconcile_workloads() == 0
+
+
+def test_reconcile_repairs_drift(app):
+    admin_id, worker_ids, complaint_ids, tokens = _seed(app)
+    with app.app_context():
+        Complaint.query.filter(Complaint.id.in_(complaint_ids[:10])).update(
+            {'status': 'in_progress'}, synchronize_session=False)
+        User.query.filter(User.id.in_(worker_ids)).update({'active_tasks': 7, 'workload': 'Free'},
+                                                          synchronize_session=False)
+        db.session.commit()
+
+        assert reconcile_workloads() == len(worker_ids)
+        assert reconcile_workloads() == 0
+    _assert_consistent(app)
@@ -0,0 +1,122 @@
+"""Worker workload accounting.
+
+``users.active_tasks`` is the number of complaints a worker has
+``in_progress`` and ``users.workload`` is ``Busy`` while that number is
+positive. Status changes adjust the counter with a single atomic SQL
+UPDATE inside the request's transaction, so concurrent updates from several
+workers can't lose increments. ``reconcile_workloads`` recomputes both
+columns from ``complaints`` to repair any drift (e.g. rows edited by hand).
+"""
+import logging
+import threading
+from collections import defaultdict
+
+import click
+from sqlalchemy import bindparam, case, func, update
+
+from extensions import db
+from models import Complaint, User
+
+logger = logging.getLogger('snapfix.workload')
+
+IN_PROGRESS = 'in_progress'
+
+
+def _workload_label(active_tasks):
+    return 'Busy' if active_tasks > 0 else 'Free'
+
+
+def _adjust(worker_id, delta):
+    tasks = func.coalesce(User.active_tasks, 0) + delta
+    db.session.execute(
+        update(User)
+        .where(User.id == worker_id)
+        .values(
+            # Right-hand sides see the pre-update row, so both use the same new value.
+            active_tasks=case((tasks < 0, 0), else_=tasks),
+            workload=case((tasks > 0, 'Busy'), else_='Free'),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def apply_status_change(old_worker_id, old_status, new_worker_id, new_status):
+    """Adjust worker counters for a complaint moving between (worker, status) pairs.
+
+    Must run in the same transaction as the complaint update; nothing is committed here.
+    """
+    deltas = defaultdict(int)
+    if old_worker_id is not None and old_status == IN_PROGRESS:
+        deltas[int(old_worker_id)] -= 1
+    if new_worker_id is not None and new_status == IN_PROGRESS:
+        deltas[int(new_worker_id)] += 1
+    for worker_id, delta in sorted(deltas.items()):
+        if delta:
+            _adjust(worker_id, delta)
+
+
+def reconcile_workloads():
+    """Recompute ``active_tasks``/``workload`` for every worker; returns the number of rows fixed."""
+    # Read the counters before the counts: a status change committed in between
+    # moves the counter, so the guarded UPDATE below skips that worker and the
+    # next run picks it up instead of overwriting a fresh value with a stale one.
+    workers = db.session.query(User.id, User.active_tasks, User.workload).filter(User.role == 'worker').all()
+    counts = dict(
+        db.session.query(Complaint.worker_id, func.count(Complaint.id))
+        .filter(Complaint.status == IN_PROGRESS, Complaint.worker_id.isnot(None))
+        .group_by(Complaint.worker_id)
+        .all()
+    )
+
+    fixes = []
+    for worker_id, active_tasks, workload in workers:
+        expected = counts.get(worker_id, 0)
+        if active_tasks != expected or workload != _workload_label(expected):
+            fixes.append({
+                'b_id': worker_id,
+                'b_seen': -1 if active_tasks is None else active_tasks,
+                'active_tasks': expected,
+                'workload': _workload_label(expected),
+            })
+
+    if fixes:
+        users = User.__table__
+        db.session.execute(
+            users.update()
+            .where(users.c.id == bindparam('b_id'))
+            .where(func.coalesce(users.c.active_tasks, -1) == bindparam('b_seen')),
+            fixes,
+        )
+    db.session.commit()
+
+    if fixes:
+        logger.warning('worker workload drift repaired', extra={'workers': [fix['b_id'] for fix in fixes]})
+    return len(fixes)
+
+
+def start_reconciler(app):
+    """Run ``reconcile_workloads`` every ``WORKLOAD_RECONCILE_INTERVAL`` seconds in a daemon thread."""
+    interval = app.config['WORKLOAD_RECONCILE_INTERVAL']
+    if not interval:
+        return None
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                with app.app_context():
+                    reconcile_workloads()
+            except Exception:
+                logger.exception('workload reconciliation failed')
+
+    thread = threading.Thread(target=loop, name='workload-reconciler', daemon=True)
+    thread.stop = stop
+    thread.start()
+    return thread
+
+
+def init_app(app):
+    @app.cli.command('reconcile-workloads')
+    def reconcile_workloads_command():
+        """Recompute worker active_tasks/workload from complaints."""
+        click.echo(f'{reconcile_workloads()} worker(s) corrected')
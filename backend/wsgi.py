@@ -0,0 +1,7 @@
+"""Production entry point: ``gunicorn -c gunicorn.conf.py wsgi:app``.
+
+The schema is not created here; run ``flask --app app init-db`` first.
+"""
+from app import create_app
+
+app = create_app()
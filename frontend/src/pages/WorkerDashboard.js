@@ -8,7 +8,8 @@ import {
   Clock, 
   CheckCircle,
   User,
-  AlertCircle
+  AlertCircle,
+  MapPin
 } from 'lucide-react';
 import './Dashboard.css';
 
@@ -16,6 +17,7 @@ const WorkerDashboard = () => {
   const { user, logout } = useAuth();
   const navigate = useNavigate();
   const [complaints, setComplaints] = useState([]);
+  const [route, setRoute] = useState({ data: [], unlocated: [], total_km: 0 });
   const [page, setPage] = useState(1);
   const [limit] = useState(5);  
   const [totalPages, setTotalPages] = useState(1);
@@ -32,6 +34,11 @@ const WorkerDashboard = () => {
     fetchComplaints(page);
   }, [page]);
 
+  // The route only changes when a task does, not when the list is paged.
+  useEffect(() => {
+    fetchRoute();
+  }, []);
+
   const fetchComplaints = async (pageNumber = 1) => {
     try {
       setLoad(true);
@@ -58,6 +65,16 @@ const WorkerDashboard = () => {
     }
   };
 
+  const fetchRoute = async () => {
+    try {
+      const response = await axios.get('http://localhost:5000/api/worker/route');
+      setRoute(response.data);
+    } catch (error) {
+      // Keep the last route; the task list and stats don't depend on it.
+      console.error('Error fetching route:', error);
+    }
+  };
+
   const handleUpdateStatus = async (complaintId, newStatus) => {
     try {
       await axios.put(`http://localhost:5000/api/complaints/${complaintId}`, {
@@ -65,6 +82,7 @@ const WorkerDashboard = () => {
         message: `Status updated to ${newStatus}`
       });
       fetchComplaints();
+      fetchRoute();
     } catch (error) {
       console.error('Error updating status:', error);
     }
@@ -176,6 +194,49 @@ const WorkerDashboard = () => {
                 </div>
               </div>
 
+              {/* Route: open tasks in visiting order */}
+              {route.data.length > 0 && (
+                <div className="card">
+                  <div className="card-header">
+                    <h2>Today's Route</h2>
+                    <span>{route.total_km} km</span>
+                  </div>
+                  <div className="table-responsive">
+                    <table className="data-table">
+                      <thead>
+                        <tr>
+                          <th>Stop</th>
+                          <th>ID</th>
+                          <th>Title</th>
+                          <th>Priority</th>
+                          <th>Status</th>
+                          <th>Distance</th>
+                        </tr>
+                      </thead>
+                      <tbody>
+                        {route.data.map((stop) => (
+                          <tr key={stop.id}>
+                            <td>
+                              <MapPin size={16} /> {stop.stop}
+                            </td>
+                            <td>#{stop.id}</td>
+                            <td>
+                              <Link to={`/complaint/${stop.id}`}>{stop.title}</Link>
+                            </td>
+                            <td>{stop.priority}</td>
+                            <td>{getStatusBadge(stop.status)}</td>
+                            <td>+{stop.leg_km} km</td>
+                          </tr>
+                        ))}
+                      </tbody>
+                    </table>
+                    {route.unlocated.length > 0 && (
+                      <p>{route.unlocated.length} task(s) without a location are not on the route.</p>
+                    )}
+                  </div>
+                </div>
+              )}
+
               {/* Complaints Table */}
               <div className="card">
                 <div className="card-header">